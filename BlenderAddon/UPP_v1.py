@@ -35,16 +35,32 @@ bl_info = {
 }
 
 import bpy
+import bpy.utils.previews
 import os
+import sys
 import math
 import colorsys
+import fnmatch
+import hashlib
+import heapq
+import itertools
 import random
+import struct
+import tempfile
+import threading
+import time
+import zlib
+import multiprocessing
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
 from bpy.props import (
     StringProperty, IntProperty, FloatProperty, BoolProperty,
     EnumProperty, FloatVectorProperty, CollectionProperty, PointerProperty
 )
-from bpy.types import PropertyGroup, Operator, Panel, AddonPreferences
+from bpy.types import PropertyGroup, Operator, Panel, UIList, AddonPreferences
 from mathutils import Color
 
 
@@ -66,6 +82,80 @@ COLOR_NAMES = {
     (255, 99, 71): "Tomato", (255, 69, 0): "Orange Red", (220, 20, 60): "Crimson",
 }
 
+# CSS Color Module named colors (aliases such as Fuchsia/Magenta appear once)
+CSS_COLOR_NAMES = {
+    (240, 248, 255): "Alice Blue", (250, 235, 215): "Antique White", (0, 255, 255): "Aqua",
+    (127, 255, 212): "Aquamarine", (240, 255, 255): "Azure", (245, 245, 220): "Beige",
+    (255, 228, 196): "Bisque", (0, 0, 0): "Black", (255, 235, 205): "Blanched Almond",
+    (0, 0, 255): "Blue", (138, 43, 226): "Blue Violet", (165, 42, 42): "Brown",
+    (222, 184, 135): "Burlywood", (95, 158, 160): "Cadet Blue", (127, 255, 0): "Chartreuse",
+    (210, 105, 30): "Chocolate", (255, 127, 80): "Coral", (100, 149, 237): "Cornflower Blue",
+    (255, 248, 220): "Cornsilk", (220, 20, 60): "Crimson", (0, 0, 139): "Dark Blue",
+    (0, 139, 139): "Dark Cyan", (184, 134, 11): "Dark Goldenrod", (169, 169, 169): "Dark Gray",
+    (0, 100, 0): "Dark Green", (189, 183, 107): "Dark Khaki", (139, 0, 139): "Dark Magenta",
+    (85, 107, 47): "Dark Olive Green", (255, 140, 0): "Dark Orange", (153, 50, 204): "Dark Orchid",
+    (139, 0, 0): "Dark Red", (233, 150, 122): "Dark Salmon", (143, 188, 143): "Dark Sea Green",
+    (72, 61, 139): "Dark Slate Blue", (47, 79, 79): "Dark Slate Gray", (0, 206, 209): "Dark Turquoise",
+    (148, 0, 211): "Dark Violet", (255, 20, 147): "Deep Pink", (0, 191, 255): "Deep Sky Blue",
+    (105, 105, 105): "Dim Gray", (30, 144, 255): "Dodger Blue", (178, 34, 34): "Firebrick",
+    (255, 250, 240): "Floral White", (34, 139, 34): "Forest Green", (220, 220, 220): "Gainsboro",
+    (248, 248, 255): "Ghost White", (255, 215, 0): "Gold", (218, 165, 32): "Goldenrod",
+    (128, 128, 128): "Gray", (0, 128, 0): "Green", (173, 255, 47): "Green Yellow",
+    (240, 255, 240): "Honeydew", (255, 105, 180): "Hot Pink", (205, 92, 92): "Indian Red",
+    (75, 0, 130): "Indigo", (255, 255, 240): "Ivory", (240, 230, 140): "Khaki",
+    (230, 230, 250): "Lavender", (255, 240, 245): "Lavender Blush", (124, 252, 0): "Lawn Green",
+    (255, 250, 205): "Lemon Chiffon", (173, 216, 230): "Light Blue", (240, 128, 128): "Light Coral",
+    (224, 255, 255): "Light Cyan", (250, 250, 210): "Light Goldenrod", (211, 211, 211): "Light Gray",
+    (144, 238, 144): "Light Green", (255, 182, 193): "Light Pink", (255, 160, 122): "Light Salmon",
+    (32, 178, 170): "Light Sea Green", (135, 206, 250): "Light Sky Blue", (119, 136, 153): "Light Slate Gray",
+    (176, 196, 222): "Light Steel Blue", (255, 255, 224): "Light Yellow", (0, 255, 0): "Lime",
+    (50, 205, 50): "Lime Green", (250, 240, 230): "Linen", (255, 0, 255): "Magenta",
+    (128, 0, 0): "Maroon", (102, 205, 170): "Medium Aquamarine", (0, 0, 205): "Medium Blue",
+    (186, 85, 211): "Medium Orchid", (147, 112, 219): "Medium Purple", (60, 179, 113): "Medium Sea Green",
+    (123, 104, 238): "Medium Slate Blue", (0, 250, 154): "Medium Spring Green", (72, 209, 204): "Medium Turquoise",
+    (199, 21, 133): "Medium Violet Red", (25, 25, 112): "Midnight Blue", (245, 255, 250): "Mint Cream",
+    (255, 228, 225): "Misty Rose", (255, 228, 181): "Moccasin", (255, 222, 173): "Navajo White",
+    (0, 0, 128): "Navy", (253, 245, 230): "Old Lace", (128, 128, 0): "Olive",
+    (107, 142, 35): "Olive Drab", (255, 165, 0): "Orange", (255, 69, 0): "Orange Red",
+    (218, 112, 214): "Orchid", (238, 232, 170): "Pale Goldenrod", (152, 251, 152): "Pale Green",
+    (175, 238, 238): "Pale Turquoise", (219, 112, 147): "Pale Violet Red", (255, 239, 213): "Papaya Whip",
+    (255, 218, 185): "Peach Puff", (205, 133, 63): "Peru", (255, 192, 203): "Pink",
+    (221, 160, 221): "Plum", (176, 224, 230): "Powder Blue", (128, 0, 128): "Purple",
+    (102, 51, 153): "Rebecca Purple", (188, 143, 143): "Rosy Brown", (65, 105, 225): "Royal Blue",
+    (139, 69, 19): "Saddle Brown", (250, 128, 114): "Salmon", (244, 164, 96): "Sandy Brown",
+    (46, 139, 87): "Sea Green", (255, 245, 238): "Seashell", (160, 82, 45): "Sienna",
+    (192, 192, 192): "Silver", (135, 206, 235): "Sky Blue", (106, 90, 205): "Slate Blue",
+    (112, 128, 144): "Slate Gray", (255, 250, 250): "Snow", (0, 255, 127): "Spring Green",
+    (70, 130, 180): "Steel Blue", (210, 180, 140): "Tan", (0, 128, 128): "Teal",
+    (216, 191, 216): "Thistle", (255, 99, 71): "Tomato", (64, 224, 208): "Turquoise",
+    (238, 130, 238): "Violet", (245, 222, 179): "Wheat", (255, 255, 255): "White",
+    (245, 245, 245): "White Smoke", (255, 255, 0): "Yellow", (154, 205, 50): "Yellow Green",
+}
+
+# Hue families for generated names; each is combined with every lightness
+# and chroma modifier below
+HUE_NAMES = [
+    ("Crimson", "DC143C"), ("Red", "FF0000"), ("Scarlet", "FF2400"), ("Vermilion", "E34234"),
+    ("Persimmon", "EC5800"), ("Orange", "FF8000"), ("Amber", "FFBF00"), ("Gold", "FFD700"),
+    ("Yellow", "FFFF00"), ("Lime", "BFFF00"), ("Chartreuse", "7FFF00"), ("Green", "00C000"),
+    ("Emerald", "50C878"), ("Jade", "00A86B"), ("Mint", "3EB489"), ("Teal", "008080"),
+    ("Turquoise", "40E0D0"), ("Cyan", "00FFFF"), ("Cerulean", "007BA7"), ("Azure", "007FFF"),
+    ("Cobalt", "0047AB"), ("Blue", "0000FF"), ("Ultramarine", "3F00FF"), ("Indigo", "4B0082"),
+    ("Violet", "8F00FF"), ("Purple", "800080"), ("Orchid", "DA70D6"), ("Magenta", "FF00FF"),
+    ("Fuchsia", "FF00BF"), ("Rose", "FF007F"), ("Raspberry", "E30B5C"), ("Cerise", "DE3163"),
+]
+
+# OKLab lightness of each lightness modifier
+LIGHTNESS_NAMES = [
+    (0.28, "Very Dark"), (0.38, "Dark"), (0.48, "Deep"), (0.58, ""),
+    (0.70, "Light"), (0.82, "Pale"), (0.92, "Very Pale"),
+]
+
+# Fraction of the most saturated in-gamut chroma for each chroma modifier
+CHROMA_NAMES = [
+    (0.12, "Grayish"), (0.3, "Dusty"), (0.5, "Muted"), (0.75, ""), (1.0, "Vivid"),
+]
+
 PRESET_PALETTES = {
     "Nature": {
         "Forest": [(0.133, 0.286, 0.141), (0.180, 0.392, 0.184), (0.275, 0.510, 0.255), 
@@ -187,6 +277,7 @@ ARRANGEMENT_TYPES = [
     ('SPIRAL', 'Spiral', 'Arrange in spiral pattern from center', 'FORCE_VORTEX', 12),
     ('DIAGONAL', 'Diagonal Bands', 'Arrange in diagonal bands', 'OUTLINER_DATA_LATTICE', 13),
     ('CHECKERBOARD', 'Checkerboard', 'Alternating pattern', 'VIEW_ORTHO', 14),
+    ('SMOOTH_GRID', 'Smooth Grid', 'Place similar colors next to each other in 2D', 'MESH_GRID', 15),
 ]
 
 EXTRACTION_ALGORITHMS = [
@@ -194,6 +285,50 @@ EXTRACTION_ALGORITHMS = [
     ('MEDIAN_CUT', 'Median Cut', 'Balanced color distribution', 'MOD_REMESH', 1),
     ('DOMINANT', 'Dominant', 'Most frequent colors', 'COMMUNITY', 2),
     ('DIVERSE', 'Diverse', 'Maximum color variety', 'PARTICLE_DATA', 3),
+    ('WU', 'Wu Quantizer', 'Deterministic variance-minimizing box splits', 'MESH_CUBE', 4),
+]
+
+COLOR_METRICS = [
+    ('RGB', 'RGB', 'Euclidean distance between RGB values', 0),
+    ('OKLAB', 'OKLab', 'Perceptual distance in the OKLab color space', 1),
+    ('CIELAB', 'CIELAB (ΔE76)', 'Euclidean distance in CIE L*a*b*', 2),
+    ('DE2000', 'CIEDE2000', 'CIE ΔE2000 color difference, the most accurate and the slowest', 3),
+]
+
+SWATCH_HUE_FILTERS = [
+    ('ALL', 'All Hues', 'Show every swatch'),
+    ('RED', 'Red', 'Reds'),
+    ('ORANGE', 'Orange', 'Oranges and browns'),
+    ('YELLOW', 'Yellow', 'Yellows'),
+    ('GREEN', 'Green', 'Greens'),
+    ('CYAN', 'Cyan', 'Cyans and teals'),
+    ('BLUE', 'Blue', 'Blues'),
+    ('PURPLE', 'Purple', 'Purples and violets'),
+    ('MAGENTA', 'Magenta', 'Magentas and pinks'),
+    ('NEUTRAL', 'Neutral', 'Grays, near-whites and near-blacks'),
+]
+
+# Hue range of each hue family in degrees, (start, end); RED wraps past 360
+HUE_FILTER_RANGES = {
+    'RED': (345, 15),
+    'ORANGE': (15, 45),
+    'YELLOW': (45, 70),
+    'GREEN': (70, 165),
+    'CYAN': (165, 195),
+    'BLUE': (195, 255),
+    'PURPLE': (255, 290),
+    'MAGENTA': (290, 345),
+}
+
+# Below either of these a swatch counts as neutral rather than a hue
+NEUTRAL_SATURATION = 0.1
+NEUTRAL_VALUE = 0.1
+
+SWATCH_SORT_MODES = [
+    ('INDEX', 'Grid Order', 'Order of the swatches in the grid'),
+    ('HUE', 'Hue', 'Sort by hue'),
+    ('LUMINANCE', 'Luminance', 'Sort by brightness'),
+    ('NAME', 'Name', 'Sort by color name'),
 ]
 
 GRID_SIZES = [
@@ -206,6 +341,8 @@ GRID_SIZES = [
     ('10', '10×10', '100 colors'),
     ('12', '12×12', '144 colors'),
     ('16', '16×16', '256 colors'),
+    ('32', '32×32', '1024 colors - Large'),
+    ('64', '64×64', '4096 colors - LUT textures'),
 ]
 
 EXPORT_FORMATS = [
@@ -257,6 +394,12 @@ CLIPBOARD_FORMATS = [
 # UTILITY FUNCTIONS
 # ============================================================================
 
+def get_addon_preferences():
+    """Return the addon preferences, or None when not installed as an addon."""
+    addon = bpy.context.preferences.addons.get(__name__)
+    return addon.preferences if addon else None
+
+
 def clamp(value, min_val=0.0, max_val=1.0):
     """Clamp a value between min and max."""
     return max(min_val, min(max_val, value))
@@ -282,25 +425,6 @@ def get_color_temperature(r, g, b):
     return (r - b) + (r - g) * 0.5
 
 
-def get_color_name(r, g, b):
-    """Get nearest named color - optimized version."""
-    r_int, g_int, b_int = int(r * 255), int(g * 255), int(b * 255)
-    
-    min_dist = float('inf')
-    nearest_name = "Color"
-    
-    for (cr, cg, cb), name in COLOR_NAMES.items():
-        # Skip early if any channel diff is too large
-        if abs(cr - r_int) > 100 and abs(cg - g_int) > 100:
-            continue
-        dist = (cr - r_int)**2 + (cg - g_int)**2 + (cb - b_int)**2
-        if dist < min_dist:
-            min_dist = dist
-            nearest_name = name
-    
-    return nearest_name
-
-
 def shift_hue(r, g, b, amount):
     """Shift hue by amount (0-1)."""
     h, s, v = rgb_to_hsv(r, g, b)
@@ -322,99 +446,511 @@ def adjust_value(r, g, b, factor):
     return hsv_to_rgb(h, s, v)
 
 
-def color_distance(c1, c2):
+def as_color_array(colors):
+    """Return a color sequence as an (N, 3) float32 array, dropping alpha."""
+    if len(colors) == 0:
+        return np.zeros((0, 3), dtype=np.float32)
+    return np.asarray(colors, dtype=np.float32)[:, :3]
+
+
+# ============================================================================
+# BATCH COLOR MATH
+# ============================================================================
+# NumPy versions of the colorsys conversions and the color helpers above.
+# Each takes and returns (N, 3) float arrays and matches the scalar function
+# it mirrors, so whole palettes are converted without a Python-level loop.
+
+def _hue_from_rgb(rgb, maxc, delta):
+    """Shared hue term of the HSV and HLS conversions (colorsys formula)."""
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    safe = np.where(delta > 0, delta, 1.0)
+    rc, gc, bc = (maxc - r) / safe, (maxc - g) / safe, (maxc - b) / safe
+    
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = (h / 6.0) % 1.0
+    return np.where(delta > 0, h, 0.0)
+
+
+def rgb_to_hsv_array(rgb):
+    """Convert (N, 3) RGB to HSV."""
+    rgb = np.asarray(rgb, dtype=np.float64).reshape(-1, 3)
+    maxc, minc = rgb.max(axis=1), rgb.min(axis=1)
+    delta = maxc - minc
+    
+    s = np.where(maxc > 0, delta / np.where(maxc > 0, maxc, 1.0), 0.0)
+    return np.stack([_hue_from_rgb(rgb, maxc, delta), s, maxc], axis=1)
+
+
+def hsv_to_rgb_array(hsv):
+    """Convert (N, 3) HSV to RGB."""
+    hsv = np.asarray(hsv, dtype=np.float64).reshape(-1, 3)
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+    
+    sector = np.floor(h * 6.0)
+    f = h * 6.0 - sector
+    sector = sector.astype(np.int64) % 6
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    
+    # Channel sources for each of the six hue sectors
+    choices = np.stack([v, q, p, t], axis=1)
+    table = np.array([
+        [0, 3, 2], [1, 0, 2], [2, 0, 3], [2, 1, 0], [3, 2, 0], [0, 2, 1],
+    ])
+    return np.take_along_axis(choices, table[sector], axis=1)
+
+
+def rgb_to_hls_array(rgb):
+    """Convert (N, 3) RGB to HLS."""
+    rgb = np.asarray(rgb, dtype=np.float64).reshape(-1, 3)
+    maxc, minc = rgb.max(axis=1), rgb.min(axis=1)
+    delta = maxc - minc
+    l = (maxc + minc) / 2.0
+    
+    denominator = np.where(l <= 0.5, maxc + minc, 2.0 - maxc - minc)
+    s = np.where(delta > 0, delta / np.where(denominator != 0, denominator, 1.0), 0.0)
+    return np.stack([_hue_from_rgb(rgb, maxc, delta), l, s], axis=1)
+
+
+def hls_to_rgb_array(hls):
+    """Convert (N, 3) HLS to RGB."""
+    hls = np.asarray(hls, dtype=np.float64).reshape(-1, 3)
+    h, l, s = hls[:, 0], hls[:, 1], hls[:, 2]
+    
+    m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - l * s)
+    m1 = 2.0 * l - m2
+    
+    def channel(hue):
+        hue = hue % 1.0
+        return np.select(
+            [hue < 1 / 6, hue < 0.5, hue < 2 / 3],
+            [m1 + (m2 - m1) * hue * 6.0, m2, m1 + (m2 - m1) * (2 / 3 - hue) * 6.0],
+            m1,
+        )
+    
+    return np.stack([channel(h + 1 / 3), channel(h), channel(h - 1 / 3)], axis=1)
+
+
+def luminance_array(rgb):
+    """Perceived luminance (ITU-R BT.709) of (N, 3) colors."""
+    return np.asarray(rgb, dtype=np.float64).reshape(-1, 3) @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def temperature_array(rgb):
+    """Color temperature estimate of (N, 3) colors (warm positive, cool negative)."""
+    return np.asarray(rgb, dtype=np.float64).reshape(-1, 3) @ np.array([1.5, -0.5, -1.0])
+
+
+def shift_hue_array(rgb, amount):
+    """Shift the hue of (N, 3) colors by amount (0-1)."""
+    hsv = rgb_to_hsv_array(rgb)
+    hsv[:, 0] = (hsv[:, 0] + amount) % 1.0
+    return hsv_to_rgb_array(hsv)
+
+
+def adjust_saturation_array(rgb, factor):
+    """Scale the saturation of (N, 3) colors."""
+    hsv = rgb_to_hsv_array(rgb)
+    hsv[:, 1] = np.clip(hsv[:, 1] * factor, 0.0, 1.0)
+    return hsv_to_rgb_array(hsv)
+
+
+def adjust_value_array(rgb, factor):
+    """Scale the value/brightness of (N, 3) colors."""
+    hsv = rgb_to_hsv_array(rgb)
+    hsv[:, 2] = np.clip(hsv[:, 2] * factor, 0.0, 1.0)
+    return hsv_to_rgb_array(hsv)
+
+
+def color_tuples(rgb):
+    """Convert an (N, 3) array back to a list of RGB tuples."""
+    return [tuple(c) for c in np.asarray(rgb, dtype=np.float64).reshape(-1, 3).tolist()]
+
+
+# ============================================================================
+# PERCEPTUAL COLOR SPACES
+# ============================================================================
+# Palette values are treated as sRGB-encoded. Distances that should follow
+# perception are measured in OKLab or CIELAB (or with CIEDE2000), all
+# reached through linear light. The sRGB transfer curves are tabulated once
+# at import so the per-pixel power functions become a single table lookup.
+
+# Entries in the sRGB transfer lookup tables
+TRANSFER_LUT_SIZE = 1 << 16
+
+
+def _srgb_decode(values):
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def _srgb_encode(values):
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * values ** (1 / 2.4) - 0.055)
+
+
+_LUT_INPUTS = np.linspace(0.0, 1.0, TRANSFER_LUT_SIZE)
+SRGB_TO_LINEAR_LUT = _srgb_decode(_LUT_INPUTS).astype(np.float32)
+LINEAR_TO_SRGB_LUT = _srgb_encode(_LUT_INPUTS).astype(np.float32)
+del _LUT_INPUTS
+
+
+def _apply_transfer(values, lut, curve):
+    """Look values up in a transfer LUT; values above 1 use the exact curve."""
+    values = np.maximum(np.asarray(values, dtype=np.float32), 0.0)
+    index = np.minimum(values * (TRANSFER_LUT_SIZE - 1) + 0.5, TRANSFER_LUT_SIZE - 1)
+    result = lut[index.astype(np.intp)]
+    over = values > 1.0
+    if over.any():
+        result[over] = curve(values[over])
+    return result
+
+
+def srgb_to_linear(rgb):
+    """Decode sRGB-encoded values to linear light."""
+    return _apply_transfer(rgb, SRGB_TO_LINEAR_LUT, _srgb_decode)
+
+
+def linear_to_srgb(rgb):
+    """Encode linear-light values as sRGB."""
+    return _apply_transfer(rgb, LINEAR_TO_SRGB_LUT, _srgb_encode)
+
+
+# Linear sRGB -> LMS and LMS' -> Lab matrices of Björn Ottosson's OKLab
+OKLAB_M1 = np.array([
+    [0.4122214708, 0.5363325363, 0.0514459929],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005],
+], dtype=np.float32)
+OKLAB_M2 = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757660],
+], dtype=np.float32)
+
+# Linear sRGB -> CIE XYZ, and the D65 reference white
+SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+], dtype=np.float32)
+D65_WHITE = np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+
+
+def srgb_to_oklab(rgb):
+    """Convert (N, 3) sRGB colors to OKLab, where Euclidean distance
+    approximates perceived color difference."""
+    lms = np.cbrt(srgb_to_linear(rgb) @ OKLAB_M1.T)
+    return np.ascontiguousarray(lms @ OKLAB_M2.T, dtype=np.float32)
+
+
+def oklab_to_srgb(lab):
+    """Convert (N, 3) OKLab colors back to sRGB (unclipped)."""
+    lms = np.asarray(lab, dtype=np.float32) @ np.linalg.inv(OKLAB_M2).T
+    linear = (lms ** 3) @ np.linalg.inv(OKLAB_M1).T
+    return np.sign(linear) * linear_to_srgb(np.abs(linear))
+
+
+def srgb_to_cielab(rgb):
+    """Convert (N, 3) sRGB colors to CIE L*a*b* (D65)."""
+    xyz = (srgb_to_linear(rgb) @ SRGB_TO_XYZ.T) / D65_WHITE
+    delta = 6.0 / 29.0
+    f = np.where(xyz > delta ** 3, np.cbrt(xyz), xyz / (3 * delta ** 2) + 4.0 / 29.0)
+    lab = np.stack([
+        116.0 * f[:, 1] - 16.0,
+        500.0 * (f[:, 0] - f[:, 1]),
+        200.0 * (f[:, 1] - f[:, 2]),
+    ], axis=1)
+    return np.ascontiguousarray(lab, dtype=np.float32)
+
+
+def delta_e_2000(lab1, lab2):
+    """CIEDE2000 difference between CIELAB colors (broadcasting)."""
+    lab1 = np.asarray(lab1, dtype=np.float64)
+    lab2 = np.asarray(lab2, dtype=np.float64)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+    
+    c_mean7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2.0) ** 7
+    g = 0.5 * (1.0 - np.sqrt(c_mean7 / (c_mean7 + 25.0 ** 7)))
+    a1, a2 = a1 * (1.0 + g), a2 * (1.0 + g)
+    c1, c2 = np.hypot(a1, b1), np.hypot(a2, b2)
+    h1 = np.degrees(np.arctan2(b1, a1)) % 360.0
+    h2 = np.degrees(np.arctan2(b2, a2)) % 360.0
+    chroma = c1 * c2
+    
+    dh = h2 - h1
+    dh = np.where(dh > 180.0, dh - 360.0, np.where(dh < -180.0, dh + 360.0, dh))
+    dh = np.where(chroma == 0, 0.0, dh)
+    dL = L2 - L1
+    dC = c2 - c1
+    dH = 2.0 * np.sqrt(chroma) * np.sin(np.radians(dh / 2.0))
+    
+    L_mean = (L1 + L2) / 2.0
+    c_mean = (c1 + c2) / 2.0
+    h_mean = (h1 + h2) / 2.0
+    h_mean = np.where(np.abs(h1 - h2) > 180.0,
+                      np.where(h1 + h2 < 360.0, h_mean + 180.0, h_mean - 180.0), h_mean)
+    h_mean = np.where(chroma == 0, h1 + h2, h_mean)
+    
+    t = (1.0 - 0.17 * np.cos(np.radians(h_mean - 30.0)) + 0.24 * np.cos(np.radians(2.0 * h_mean))
+         + 0.32 * np.cos(np.radians(3.0 * h_mean + 6.0)) - 0.20 * np.cos(np.radians(4.0 * h_mean - 63.0)))
+    rotation = 30.0 * np.exp(-((h_mean - 275.0) / 25.0) ** 2)
+    c_mean7 = c_mean ** 7
+    rc = 2.0 * np.sqrt(c_mean7 / (c_mean7 + 25.0 ** 7))
+    sl = 1.0 + 0.015 * (L_mean - 50.0) ** 2 / np.sqrt(20.0 + (L_mean - 50.0) ** 2)
+    sc = 1.0 + 0.045 * c_mean
+    sh = 1.0 + 0.015 * c_mean * t
+    rt = -np.sin(np.radians(2.0 * rotation)) * rc
+    
+    return np.sqrt((dL / sl) ** 2 + (dC / sc) ** 2 + (dH / sh) ** 2 + rt * (dC / sc) * (dH / sh))
+
+
+def to_metric_space(rgb, metric):
+    """Coordinates in which ``metric`` is measured (CIEDE2000 uses CIELAB)."""
+    if metric == 'OKLAB':
+        return srgb_to_oklab(rgb)
+    if metric in ('CIELAB', 'DE2000'):
+        return srgb_to_cielab(rgb)
+    return np.ascontiguousarray(rgb, dtype=np.float32)
+
+
+def metric_distance_to(points, center, metric, point_sq=None):
+    """Squared distance from metric-space points to one center.
+
+    ``point_sq`` (``squared_norms(points)``) speeds up repeated Euclidean
+    calls; CIEDE2000 is evaluated directly.
+    """
+    if metric == 'DE2000':
+        return (delta_e_2000(points, center) ** 2).astype(np.float32)
+    return squared_distance_to(points, center, point_sq)
+
+
+# Pairs per block when CIEDE2000 distance matrices are built, bounding its
+# float64 temporaries
+DE2000_BLOCK_PAIRS = 1 << 20
+
+
+def pairwise_distances(rgb, metric='OKLAB'):
+    """(N, N) matrix of distances between colors."""
+    return metric_pairwise_distances(to_metric_space(as_color_array(rgb), metric), metric)
+
+
+def metric_pairwise_distances(points, metric):
+    """(N, N) float32 matrix of distances between points already in metric space.
+
+    CIEDE2000 is evaluated a block of rows at a time.
+    """
+    if metric == 'DE2000':
+        n = len(points)
+        d = np.empty((n, n), dtype=np.float32)
+        rows = max(1, DE2000_BLOCK_PAIRS // max(n, 1))
+        for start in range(0, n, rows):
+            d[start:start + rows] = delta_e_2000(points[start:start + rows, None, :], points[None, :, :])
+        return d
+    sq = squared_norms(points)
+    d = points @ points.T
+    d *= -2.0
+    d += sq[:, None]
+    d += sq[None, :]
+    np.maximum(d, 0.0, out=d)
+    return np.sqrt(d, out=d)
+
+
+def color_distance(c1, c2, metric='OKLAB'):
     """Calculate perceptual color distance."""
-    r1, g1, b1 = c1[:3]
-    r2, g2, b2 = c2[:3]
-    # Weighted Euclidean distance (red-mean approximation)
-    rmean = (r1 + r2) / 2
-    dr = r1 - r2
-    dg = g1 - g2
-    db = b1 - b2
-    return ((2 + rmean) * dr * dr + 4 * dg * dg + (3 - rmean) * db * db) ** 0.5
+    points = to_metric_space(as_color_array([c1[:3], c2[:3]]), metric)
+    if metric == 'DE2000':
+        return float(delta_e_2000(points[0], points[1]))
+    return float(np.linalg.norm(points[0] - points[1]))
+
+
+def hex_to_rgb(hex_code):
+    """Convert an 'RRGGBB' string to an (r, g, b) tuple of 0-255 ints."""
+    return tuple(int(hex_code[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def max_oklab_chroma(lightness, hue, iterations=24):
+    """Largest in-gamut OKLab chroma for each (lightness, hue angle) pair.
+
+    Bisects all pairs at once on whether the color encodes to sRGB in [0, 1].
+    """
+    low = np.zeros_like(lightness)
+    high = np.full_like(lightness, 0.4)
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        lab = np.stack([lightness, mid * np.cos(hue), mid * np.sin(hue)], axis=1)
+        rgb = oklab_to_srgb(lab)
+        inside = ((rgb >= -1e-4) & (rgb <= 1 + 1e-4)).all(axis=1)
+        low = np.where(inside, mid, low)
+        high = np.where(inside, high, mid)
+    return low
+
+
+def build_color_name_table():
+    """Build the named color database as (names, (N, 3) sRGB array).
+
+    COLOR_NAMES come first and the CSS colors next, then one generated
+    name per hue family, lightness and chroma modifier (for example
+    "Dark Muted Teal"), placed in OKLCh so the steps are perceptually
+    even. A color value listed twice keeps its first name.
+    """
+    names = list(COLOR_NAMES.values()) + list(CSS_COLOR_NAMES.values())
+    rgb = [np.array(list(COLOR_NAMES.keys()) + list(CSS_COLOR_NAMES.keys()), dtype=np.float32) / 255.0]
+    
+    anchors = srgb_to_oklab(np.array([hex_to_rgb(h) for _, h in HUE_NAMES], dtype=np.float32) / 255.0)
+    hue_angles = np.arctan2(anchors[:, 2], anchors[:, 1])
+    
+    hue, lightness = np.meshgrid(hue_angles, [l for l, _ in LIGHTNESS_NAMES], indexing='ij')
+    hue, lightness = hue.ravel(), lightness.ravel()
+    max_chroma = max_oklab_chroma(lightness, hue)
+    
+    for fraction, chroma_name in CHROMA_NAMES:
+        chroma = max_chroma * fraction
+        lab = np.stack([lightness, chroma * np.cos(hue), chroma * np.sin(hue)], axis=1)
+        rgb.append(np.clip(oklab_to_srgb(lab), 0.0, 1.0))
+        for hue_name, _ in HUE_NAMES:
+            for _, lightness_name in LIGHTNESS_NAMES:
+                names.append(" ".join(w for w in (lightness_name, chroma_name, hue_name) if w))
+    
+    rgb = np.concatenate(rgb).astype(np.float32)
+    _, first = np.unique(np.rint(rgb * 255).astype(np.int32), axis=0, return_index=True)
+    first.sort()
+    return [names[i] for i in first.tolist()], rgb[first]
+
+
+class ColorNameIndex:
+    """Nearest color name lookup through a precomputed LUT (Singleton).
+
+    For each metric the sRGB cube is sampled at 32 levels per channel
+    (including 0 and 1) and every sample stores its nearest named color,
+    so naming a palette is one vectorized table lookup. CIEDE2000 shares
+    the CIELAB table.
+    """
+    
+    _instance = None
+    
+    # Bits per channel of the lookup table (32^3 cells)
+    LUT_BITS = 5
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if not self.initialized:
+            self.names = None
+            self.rgb = None
+            self.luts = {}
+            self.initialized = True
+    
+    def build(self, metric='OKLAB'):
+        """Build (if needed) and return the lookup table for a metric."""
+        if self.names is None:
+            names, self.rgb = build_color_name_table()
+            self.names = np.array(names, dtype=object)
+        
+        space = 'CIELAB' if metric == 'DE2000' else metric
+        lut = self.luts.get(space)
+        if lut is None:
+            size = 1 << self.LUT_BITS
+            axis = np.linspace(0.0, 1.0, size, dtype=np.float32)
+            cells = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+            labels, _ = assign_to_centers(to_metric_space(cells, space), to_metric_space(self.rgb, space))
+            lut = self.luts[space] = labels.astype(np.uint16)
+        return lut
+    
+    def lookup(self, colors, metric='OKLAB'):
+        """Name every color in a sequence."""
+        rgb = as_color_array(colors)
+        if len(rgb) == 0:
+            return []
+        
+        lut = self.build(metric)
+        bits = self.LUT_BITS
+        level = np.clip(np.rint(rgb * ((1 << bits) - 1)), 0, (1 << bits) - 1).astype(np.intp)
+        key = (level[:, 0] << (2 * bits)) | (level[:, 1] << bits) | level[:, 2]
+        return self.names[lut[key]].tolist()
+    
+    def clear(self):
+        self.luts.clear()
+
+
+def get_color_names(colors, metric='OKLAB'):
+    """Nearest named color for every color in a sequence."""
+    return ColorNameIndex().lookup(colors, metric)
+
+
+def get_color_name(r, g, b, metric='OKLAB'):
+    """Get nearest named color."""
+    return get_color_names([(r, g, b)], metric)[0]
+
+
+# ============================================================================
+# PALETTE GENERATION
+# ============================================================================
+
+# Hue offsets and saturation/value ramps (start, span) of the harmonies
+# built from groups of hue-shifted ramps
+HARMONY_RAMPS = {
+    'SPLIT_COMPLEMENTARY': ([0, 0.417, 0.583], (0.6, 0.4), (0.5, 0.5)),
+    'TRIADIC': ([0, 0.333, 0.667], (0.6, 0.4), (0.5, 0.5)),
+    'TETRADIC': ([0, 0.167, 0.5, 0.667], (0.6, 0.4), (0.5, 0.5)),
+    'SQUARE': ([0, 0.25, 0.5, 0.75], (0.5, 0.5), (0.5, 0.5)),
+    'COMPOUND': ([0, 0.083, -0.083, 0.5, 0.583, 0.417], (0.6, 0.4), (0.6, 0.4)),
+}
+
+
+def harmony_ramps(h, s, v, angles, counts, sat_ramp, val_ramp):
+    """HSV rows for groups of ``counts`` colors at hue offsets ``angles``.
+
+    Within each group saturation and value ramp linearly from
+    ``start`` to ``start + span`` times the base color's.
+    """
+    t = np.concatenate([np.arange(n) / max(n - 1, 1) for n in counts])
+    hue = np.repeat((h + np.asarray(angles, dtype=np.float64)) % 1.0, counts)
+    sat = np.clip(s * (sat_ramp[0] + t * sat_ramp[1]), 0.0, 1.0)
+    val = np.clip(v * (val_ramp[0] + t * val_ramp[1]), 0.0, 1.0)
+    return np.stack([hue, sat, val], axis=1)
+
+
+def hue_wheel(count, s=0.7, v=0.8):
+    """``count`` colors evenly spaced around the hue wheel."""
+    hsv = np.column_stack([np.arange(count) / max(count, 1), np.full(count, s), np.full(count, v)])
+    return color_tuples(hsv_to_rgb_array(hsv))
 
 
 def generate_harmony_colors(base_color, harmony_type, count=9):
     """Generate colors based on color theory harmony - optimized."""
     r, g, b = base_color[:3]
     h, s, v = rgb_to_hsv(r, g, b)
-    colors = []
+    hsv = np.zeros((0, 3))
     
     if harmony_type == 'COMPLEMENTARY':
         half = count // 2
-        for i in range(half):
-            t = i / max(half - 1, 1)
-            new_s = s * (0.5 + t * 0.5)
-            new_v = v * (0.6 + t * 0.4)
-            colors.append(hsv_to_rgb(h, clamp(new_s), clamp(new_v)))
-        for i in range(count - half):
-            t = i / max(count - half - 1, 1)
-            new_s = s * (0.5 + t * 0.5)
-            new_v = v * (0.6 + t * 0.4)
-            colors.append(hsv_to_rgb((h + 0.5) % 1.0, clamp(new_s), clamp(new_v)))
-    
-    elif harmony_type == 'SPLIT_COMPLEMENTARY':
-        angles = [0, 0.417, 0.583]
-        per_angle = count // 3
-        for i, angle in enumerate(angles):
-            new_h = (h + angle) % 1.0
-            num = per_angle + (1 if i < count % 3 else 0)
-            for j in range(num):
-                t = j / max(num - 1, 1)
-                colors.append(hsv_to_rgb(new_h, clamp(s * (0.6 + t * 0.4)), clamp(v * (0.5 + t * 0.5))))
-    
-    elif harmony_type == 'TRIADIC':
-        angles = [0, 0.333, 0.667]
-        per_angle = count // 3
-        for i, angle in enumerate(angles):
-            new_h = (h + angle) % 1.0
-            num = per_angle + (1 if i < count % 3 else 0)
-            for j in range(num):
-                t = j / max(num - 1, 1)
-                colors.append(hsv_to_rgb(new_h, clamp(s * (0.6 + t * 0.4)), clamp(v * (0.5 + t * 0.5))))
-    
-    elif harmony_type == 'TETRADIC':
-        angles = [0, 0.167, 0.5, 0.667]
-        per_angle = count // 4
-        for i, angle in enumerate(angles):
-            new_h = (h + angle) % 1.0
-            num = per_angle + (1 if i < count % 4 else 0)
-            for j in range(num):
-                t = j / max(num - 1, 1)
-                colors.append(hsv_to_rgb(new_h, clamp(s * (0.6 + t * 0.4)), clamp(v * (0.5 + t * 0.5))))
+        hsv = harmony_ramps(h, s, v, [0, 0.5], [half, count - half], (0.5, 0.5), (0.6, 0.4))
+    
+    elif harmony_type in HARMONY_RAMPS:
+        angles, sat_ramp, val_ramp = HARMONY_RAMPS[harmony_type]
+        n = len(angles)
+        counts = [count // n + (1 if i < count % n else 0) for i in range(n)]
+        hsv = harmony_ramps(h, s, v, angles, counts, sat_ramp, val_ramp)
     
     elif harmony_type == 'ANALOGOUS':
-        for i in range(count):
-            offset = (i - count // 2) * 0.083
-            new_h = (h + offset) % 1.0
-            # Deterministic variation instead of random for speed
-            sv_offset = (i % 5 - 2) * 0.1
-            colors.append(hsv_to_rgb(new_h, clamp(s + sv_offset), clamp(v - sv_offset * 0.5)))
-    
-    elif harmony_type == 'SQUARE':
-        angles = [0, 0.25, 0.5, 0.75]
-        per_angle = count // 4
-        for i, angle in enumerate(angles):
-            new_h = (h + angle) % 1.0
-            num = per_angle + (1 if i < count % 4 else 0)
-            for j in range(num):
-                t = j / max(num - 1, 1)
-                colors.append(hsv_to_rgb(new_h, clamp(s * (0.5 + t * 0.5)), clamp(v * (0.5 + t * 0.5))))
+        i = np.arange(count)
+        # Deterministic variation instead of random for speed
+        sv_offset = (i % 5 - 2) * 0.1
+        hsv = np.stack([
+            (h + (i - count // 2) * 0.083) % 1.0,
+            np.clip(s + sv_offset, 0.0, 1.0),
+            np.clip(v - sv_offset * 0.5, 0.0, 1.0),
+        ], axis=1)
     
     elif harmony_type == 'MONOCHROMATIC':
-        for i in range(count):
-            t = i / max(count - 1, 1)
-            colors.append(hsv_to_rgb(h, clamp(s * (0.3 + t * 0.7)), clamp(v * (0.3 + t * 0.7))))
-    
-    elif harmony_type == 'COMPOUND':
-        angles = [0, 0.083, -0.083, 0.5, 0.583, 0.417]
-        per_angle = count // 6
-        for i, angle in enumerate(angles):
-            new_h = (h + angle) % 1.0
-            num = per_angle + (1 if i < count % 6 else 0)
-            for j in range(num):
-                t = j / max(num - 1, 1)
-                colors.append(hsv_to_rgb(new_h, clamp(s * (0.6 + t * 0.4)), clamp(v * (0.6 + t * 0.4))))
+        hsv = harmony_ramps(h, s, v, [0], [count], (0.3, 0.7), (0.3, 0.7))
+    
+    colors = color_tuples(hsv_to_rgb_array(hsv))
     
     while len(colors) < count:
         colors.append(colors[-1] if colors else (0.5, 0.5, 0.5))
@@ -422,347 +958,1521 @@ def generate_harmony_colors(base_color, harmony_type, count=9):
     return colors[:count]
 
 
-def arrange_colors(colors, arrangement_type, grid_size):
-    """Arrange colors according to specified pattern - with new compound arrangements."""
-    color_list = list(colors)
-    n = grid_size
+# Seconds GRADIENT may spend refining its tour after the greedy pass
+GRADIENT_TIME_BUDGET = 0.5
+# Longest run of colors Or-opt tries to move elsewhere in the tour
+OR_OPT_MAX_SEGMENT = 3
+# Palette size above which GRADIENT tours measure CIEDE2000 palettes with
+# plain CIELAB distance; the full CIEDE2000 matrix costs seconds beyond it
+DE2000_TOUR_LIMIT = 1024
+
+
+def nearest_neighbour_path(distances, start=0):
+    """Greedy path visiting every node, always stepping to the nearest unvisited."""
+    n = len(distances)
+    visited = np.zeros(n, dtype=bool)
+    order = np.empty(n, dtype=np.intp)
+    order[0] = start
+    visited[start] = True
     
-    if arrangement_type == 'ORIGINAL':
-        return color_list
+    for i in range(1, n):
+        row = np.where(visited, np.inf, distances[order[i - 1]])
+        order[i] = row.argmin()
+        visited[order[i]] = True
+    return order
+
+
+def two_opt_moves(closed):
+    """Improving, non-overlapping segment reversals of a closed tour.
+
+    ``closed`` is the distance matrix in tour order with the first node
+    repeated at the end. Reversing positions i+1..j replaces edges
+    (i, i+1) and (j, j+1) with (i, j) and (i+1, j+1); every pair is scored
+    at once, the best partner of each i is kept, and moves are taken by
+    gain while their spans stay disjoint, so all of them can be applied
+    together. Returns a list of (i, j).
+    """
+    n = len(closed) - 1
+    edges = np.diagonal(closed, 1)
+    gain = edges[:, None] + edges[None, :] - closed[:-1, :-1] - closed[1:, 1:]
+    gain = np.triu(gain, 2)
+    
+    partner = gain.argmax(axis=1)
+    best = gain[np.arange(n), partner]
+    
+    moves = []
+    used = np.zeros(n + 1, dtype=bool)
+    for i in np.argsort(best)[::-1].tolist():
+        if best[i] <= 1e-6:
+            break
+        j = int(partner[i])
+        if not used[i:j + 2].any():
+            used[i:j + 2] = True
+            moves.append((i, j))
+    return moves
+
+
+def best_or_opt_move(closed, length):
+    """Best relocation of a run of ``length`` tour positions.
+
+    The run starting at ``start`` is cut out, its neighbours are joined,
+    and it is reinserted (optionally reversed) between positions ``after``
+    and ``after + 1``. Position 0 never moves. Returns
+    (gain, start, length, after, reverse).
+    """
+    n = len(closed) - 1
+    tour_distances = closed[:-1, :-1]
+    after_next = closed[:-1, 1:]
+    edges = np.diagonal(closed, 1)
+    
+    starts = np.arange(1, n - length + 1)
+    if len(starts) == 0:
+        return 0.0, 0, length, 0, False
+    ends = starts + length - 1
+    before = starts - 1
+    
+    removal = tour_distances[before, starts] + after_next[ends, ends] - after_next[before, ends]
+    forward = tour_distances.T[starts] + after_next[ends] - edges
+    backward = tour_distances.T[ends] + after_next[starts] - edges
+    insertion = np.minimum(forward, backward)
+    
+    # Inserting next to its own position is not a move
+    positions = np.arange(n)
+    own = (positions[None, :] >= before[:, None]) & (positions[None, :] <= ends[:, None])
+    gain = np.where(own, -np.inf, removal[:, None] - insertion)
+    
+    row, after = np.unravel_index(int(gain.argmax()), gain.shape)
+    reverse = bool(backward[row, after] < forward[row, after])
+    return gain[row, after], int(starts[row]), length, int(after), reverse
+
+
+def gradient_order(distances, start=0, time_budget=GRADIENT_TIME_BUDGET):
+    """Short open path through all colors for a smooth gradient.
+
+    A nearest-neighbour path is refined with 2-opt segment reversals and
+    Or-opt moves of runs of up to OR_OPT_MAX_SEGMENT colors until no
+    improving move is left or ``time_budget`` seconds have passed. A dummy
+    node at zero distance from every color turns the open path into a
+    closed tour, so the path ends may move freely.
+    """
+    n = len(distances)
+    path = nearest_neighbour_path(distances, start)
+    if n < 4:
+        return path
+    
+    extended = np.zeros((n + 1, n + 1), dtype=np.float32)
+    extended[:n, :n] = distances
+    tour = np.concatenate([[n], path])
+    deadline = time.perf_counter() + time_budget
+    pass_time = 0.0
+    
+    # Stop while another pass still fits in the budget
+    while time.perf_counter() + pass_time < deadline:
+        started = time.perf_counter()
+        closed_tour = np.append(tour, tour[0])
+        closed = extended[np.ix_(closed_tour, closed_tour)]
+        
+        moves = two_opt_moves(closed)
+        pass_time = time.perf_counter() - started
+        if moves:
+            for i, j in moves:
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+            continue
+        
+        gain, first, run_length, after, reverse = max(
+            (best_or_opt_move(closed, length) for length in range(1, OR_OPT_MAX_SEGMENT + 1)),
+            key=lambda move: move[0],
+        )
+        if gain <= 1e-6:
+            break
+        
+        segment = tour[first:first + run_length]
+        if reverse:
+            segment = segment[::-1]
+        rest = np.concatenate([tour[:first], tour[first + run_length:]])
+        insert_at = after + 1 if after < first else after + 1 - run_length
+        tour = np.concatenate([rest[:insert_at], segment, rest[insert_at:]])
+    
+    # Open the tour at the dummy node
+    cut = int(np.flatnonzero(tour == n)[0])
+    return np.concatenate([tour[cut + 1:], tour[:cut]])
+
+
+# Batch SOM training passes for SMOOTH_GRID, with a shrinking neighbourhood
+SOM_EPOCHS = 12
+# Grids above this many cells are assigned by auction instead of exactly
+EXACT_ASSIGNMENT_CELLS = 256
+# Cheapest cells each color bids for in the auction
+AUCTION_CANDIDATES = 64
+# Seconds the auction may bid before leftover colors are placed greedily
+AUCTION_TIME_BUDGET = 0.4
+
+
+def projected_grid(points, rows, cols):
+    """Grid of (rows * cols) nodes spanning the colors' two main axes.
+
+    The nodes lie on the plane of the first two principal components of
+    ``points``, spread over two standard deviations either side of the
+    mean, so rows follow the strongest variation and columns the next.
+    """
+    mean = points.mean(axis=0)
+    centered = points - mean
+    _, spread, axes = np.linalg.svd(centered, full_matrices=False)
+    scale = 2.0 * spread[:2] / np.sqrt(max(len(points), 1))
+    if len(scale) < 2:
+        scale = np.pad(scale, (0, 2 - len(scale)))
+        axes = np.pad(axes, ((0, 2 - len(axes)), (0, 0)))
+    
+    v = np.linspace(-1.0, 1.0, rows)[:, None] * scale[0]
+    u = np.linspace(-1.0, 1.0, cols)[None, :] * scale[1]
+    nodes = mean + v[..., None] * axes[0] + u[..., None] * axes[1]
+    return nodes.reshape(-1, points.shape[1]).astype(np.float32)
+
+
+def self_organizing_map(points, rows, cols, epochs=SOM_EPOCHS):
+    """Batch self-organizing map of ``points`` onto a rows x cols grid.
+
+    Starting from ``projected_grid``, each epoch moves every node to the
+    neighbourhood-weighted mean of the points nearest to it and around it,
+    with a Gaussian neighbourhood shrinking from half the grid to a single
+    cell. The Gaussian is separable, so it is applied along rows and then
+    columns instead of as a (cells, cells) matrix. Returns the
+    (rows * cols, D) node coordinates.
+    """
+    nodes = projected_grid(points, rows, cols)
+    k = rows * cols
+    dims = points.shape[1]
+    
+    row_sq = np.subtract.outer(np.arange(rows), np.arange(rows)).astype(np.float32) ** 2
+    col_sq = np.subtract.outer(np.arange(cols), np.arange(cols)).astype(np.float32) ** 2
+    
+    for sigma in np.geomspace(max(rows, cols) / 2.0, 0.5, epochs):
+        labels, _ = assign_to_centers(points, nodes)
+        totals = np.empty((k, dims + 1), dtype=np.float32)
+        totals[:, 0] = np.bincount(labels, minlength=k)
+        for c in range(dims):
+            totals[:, c + 1] = np.bincount(labels, weights=points[:, c], minlength=k)
+        
+        scale = np.float32(-0.5 / (sigma * sigma))
+        smoothed = np.exp(row_sq * scale) @ totals.reshape(rows, cols * (dims + 1))
+        smoothed = np.exp(col_sq * scale) @ smoothed.reshape(rows, cols, dims + 1)
+        smoothed = smoothed.reshape(k, dims + 1)
+        
+        filled = smoothed[:, 0] > 1e-12
+        nodes[filled] = smoothed[filled, 1:] / smoothed[filled, :1]
+    
+    return nodes
+
+
+def linear_assignment(cost):
+    """Minimum-cost one-to-one assignment of rows to columns.
+
+    Shortest augmenting path (Hungarian / Jonker-Volgenant) on a square
+    cost matrix, with every column scan done as one NumPy operation, so
+    the Python work is O(n^2) steps. Returns ``columns`` where
+    ``columns[row]`` is the column given to that row.
+    """
+    n = len(cost)
+    u = np.zeros(n + 1)
+    v = np.zeros(n + 1)
+    # Column j (1-based) is held by row owner[j] - 1; 0 means free
+    owner = np.zeros(n + 1, dtype=np.intp)
+    way = np.zeros(n + 1, dtype=np.intp)
+    
+    for row in range(1, n + 1):
+        owner[0] = row
+        j0 = 0
+        min_slack = np.full(n + 1, np.inf)
+        used = np.zeros(n + 1, dtype=bool)
+        
+        while owner[j0] != 0:
+            used[j0] = True
+            i0 = owner[j0]
+            slack = cost[i0 - 1] - u[i0] - v[1:]
+            free = ~used[1:]
+            better = free & (slack < min_slack[1:])
+            min_slack[1:][better] = slack[better]
+            way[1:][better] = j0
+            
+            candidates = np.where(free, min_slack[1:], np.inf)
+            j1 = int(candidates.argmin()) + 1
+            delta = candidates[j1 - 1]
+            
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_slack[1:][free] -= delta
+            j0 = j1
+        
+        # Flip the augmenting path back to the root
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+    
+    columns = np.empty(n, dtype=np.intp)
+    columns[owner[1:] - 1] = np.arange(n)
+    return columns
+
+
+def auction_assignment(cost, candidates=AUCTION_CANDIDATES, time_budget=AUCTION_TIME_BUDGET):
+    """Near-minimum-cost assignment of each row to a distinct column.
+
+    ``cost`` may have more columns than rows. Each row only bids for its
+    ``candidates`` cheapest columns: all unassigned rows bid at once,
+    raising a column's price by their margin over their second choice
+    plus epsilon, and the highest bid per column wins (Jacobi auction).
+    Epsilon is a few times the typical cheapest cost per row, so the
+    result is close to optimal while every round stays a handful of small
+    array operations. Costs get a random jitter below epsilon so that
+    duplicate colors spread over different columns instead of all
+    bidding for the same one. Rows still unassigned after ``time_budget``
+    seconds, which happens when many near-identical rows fight over the
+    same columns, take their cheapest free column one by one. Returns
+    ``columns`` where ``columns[row]`` is the column given to that row.
+    """
+    num_rows, num_cols = cost.shape
+    candidates = min(candidates, num_cols)
+    deadline = time.perf_counter() + time_budget
+    
+    spread = float(cost.max() - cost.min())
+    if spread <= 0:
+        return np.arange(num_rows)
+    epsilon = max(3.0 * float(cost.min(axis=1).mean() - cost.min()), 1e-6 * spread)
+    jittered = np.random.default_rng(0).random(cost.shape, dtype=np.float32)
+    jittered *= epsilon
+    jittered += cost
+    
+    options = np.argpartition(jittered, candidates - 1, axis=1)[:, :candidates]
+    benefit = -np.take_along_axis(jittered, options, axis=1)
+    
+    prices = np.zeros(num_cols, dtype=np.float32)
+    owner = np.full(num_cols, -1, dtype=np.intp)
+    columns = np.full(num_rows, -1, dtype=np.intp)
+    bidders = np.arange(num_rows)
+    
+    while len(bidders) and time.perf_counter() < deadline:
+        choices = options[bidders]
+        values = benefit[bidders] - prices[choices]
+        rows = np.arange(len(bidders))
+        pick = values.argmax(axis=1)
+        top = values[rows, pick]
+        values[rows, pick] = -np.inf
+        best = choices[rows, pick]
+        bids = prices[best] + (top - values.max(axis=1)) + epsilon
+        
+        # Highest bid per column wins it
+        order = np.lexsort((bids, best))
+        last = np.append(best[order][1:] != best[order][:-1], True)
+        won, winners = best[order][last], bidders[order][last]
+        
+        outbid = owner[won]
+        columns[outbid[outbid >= 0]] = -1
+        owner[won] = winners
+        columns[winners] = won
+        prices[won] = bids[order][last]
+        bidders = np.flatnonzero(columns < 0)
+    
+    taken = owner >= 0
+    for row in bidders.tolist():
+        column = int(np.where(taken, np.inf, jittered[row]).argmin())
+        columns[row] = column
+        taken[column] = True
+    return columns
+
+
+def smooth_grid_cells(points, rows, cols):
+    """Place colors on a rows x cols grid so that neighbours look alike.
+
+    ``points`` are the colors in metric space (``to_metric_space``). A
+    self-organizing map lays a smooth sheet of target colors over the
+    grid, then colors are matched one-to-one to cells by minimum total
+    squared distance to the targets, exactly up to EXACT_ASSIGNMENT_CELLS
+    cells and by auction beyond. Colors beyond the grid are ignored.
+    Returns the color index for every cell, -1 for empty cells.
+    """
+    cells = rows * cols
+    points = points[:cells]
+    nodes = self_organizing_map(points, rows, cols)
+    
+    cost = squared_norms(points)[:, None] + squared_norms(nodes)[None, :] - 2.0 * (points @ nodes.T)
+    
+    if cells > EXACT_ASSIGNMENT_CELLS:
+        columns = auction_assignment(cost)
+    else:
+        # Dummy colors at zero cost take up the cells left over
+        square = np.zeros((cells, cells))
+        square[:len(points)] = cost
+        columns = linear_assignment(square)
+    grid = np.full(cells, -1, dtype=np.intp)
+    grid[columns[:len(points)]] = np.arange(len(points))
+    return grid
+
+
+# Fillers for grid cells an arrangement leaves empty, by negative index
+ARRANGEMENT_FILL = {
+    -1: (0.5, 0.5, 0.5),
+    -2: (0.8, 0.8, 0.8),
+    -3: (0.2, 0.2, 0.2),
+}
+
+
+class PaletteKeys:
+    """Per-color attributes the arrangements sort on, as a struct of arrays.
+
+    Every attribute is computed once for the whole palette. Sort orders
+    and the costlier GRADIENT / SMOOTH_GRID layouts are memoized on the
+    table, so arrangements sharing a key (or re-applied to an unchanged
+    palette) cost an index lookup.
+    """
+    
+    def __init__(self, rgb):
+        self.rgb = rgb
+        self.hsv = rgb_to_hsv_array(rgb)
+        self.hls = rgb_to_hls_array(rgb)
+        self.luminance = luminance_array(rgb)
+        self.temperature = temperature_array(rgb)
+        self.oklab = srgb_to_oklab(rgb)
+        self.columns = {
+            'hue': self.hsv[:, 0],
+            'saturation': self.hsv[:, 1],
+            'value': self.hsv[:, 2],
+            'lightness': self.hls[:, 1],
+            'luminance': self.luminance,
+            'temperature': self.temperature,
+            # 12 hue segments, for grouping
+            'hue_group': (self.hsv[:, 0] * 12).astype(np.int64),
+        }
+        self.spaces = {'OKLAB': self.oklab}
+        self.memo = {}
+    
+    def __len__(self):
+        return len(self.rgb)
+    
+    def column(self, key):
+        """Attribute array by name; a leading '-' negates it."""
+        if key.startswith('-'):
+            return -self.columns[key[1:]]
+        return self.columns[key]
+    
+    def order(self, *keys):
+        """Stable sort on the named attributes, the last one being the primary key."""
+        if keys not in self.memo:
+            self.memo[keys] = np.lexsort([self.column(key) for key in keys])
+        return self.memo[keys]
+    
+    def space(self, metric):
+        """Colors in the coordinates ``metric`` is measured in."""
+        if metric not in self.spaces:
+            self.spaces[metric] = to_metric_space(self.rgb, metric)
+        return self.spaces[metric]
+
+
+class PaletteKeyCache:
+    """Recently used PaletteKeys tables keyed by palette fingerprint (Singleton).
+
+    The fingerprint is the raw bytes of the (N, 3) float32 color array, so
+    any edit to the palette misses the cache.
+    """
+    
+    _instance = None
+    
+    # Tables kept before the least recently used one is dropped
+    MAX_ENTRIES = 8
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if not self.initialized:
+            self.entries = OrderedDict()
+            self.initialized = True
+    
+    def get(self, colors):
+        """Return the PaletteKeys table for a color sequence."""
+        rgb = np.ascontiguousarray(as_color_array(colors))
+        fingerprint = rgb.tobytes()
+        keys = self.entries.get(fingerprint)
+        if keys is None:
+            keys = self.entries[fingerprint] = PaletteKeys(rgb)
+            while len(self.entries) > self.MAX_ENTRIES:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(fingerprint)
+        return keys
     
-    elif arrangement_type == 'LUMINANCE_ASC':
-        return sorted(color_list, key=lambda c: get_luminance(*c[:3]))
+    def clear(self):
+        self.entries.clear()
+
+
+def spiral_cells(n):
+    """Row-major cell of each step of a clockwise spiral from the top-left corner."""
+    steps = []
+    for ring in range((n + 1) // 2):
+        first, last = ring, n - 1 - ring
+        if first == last:
+            steps.append([first * n + first])
+            break
+        span = np.arange(first, last + 1)
+        steps += [
+            first * n + span,
+            span[1:] * n + last,
+            last * n + span[-2::-1],
+            span[-2:0:-1] * n + first,
+        ]
+    return np.concatenate(steps) if steps else np.zeros(0, dtype=np.intp)
+
+
+def diagonal_cells(n):
+    """Row-major cells ordered by anti-diagonal, top row first within each."""
+    rows, cols = np.divmod(np.arange(n * n), n)
+    return np.lexsort((rows, rows + cols))
+
+
+def place_in_cells(order, cells, total, fill=-1):
+    """Index grid of ``total`` cells with ``order`` written along ``cells``."""
+    grid = np.full(total, fill, dtype=np.intp)
+    count = min(len(order), len(cells))
+    grid[cells[:count]] = order[:count]
+    return grid
+
+
+def arrangement_indices(keys, arrangement_type, grid_size, metric='OKLAB'):
+    """Arrangement of a palette as indices into it.
+
+    ``keys`` is the palette's PaletteKeys table. Negative entries are
+    empty grid cells, filled from ARRANGEMENT_FILL.
+    """
+    count = len(keys)
+    n = grid_size
+    
+    if arrangement_type == 'LUMINANCE_ASC':
+        return keys.order('luminance')
     
     elif arrangement_type == 'LUMINANCE_DESC':
-        return sorted(color_list, key=lambda c: -get_luminance(*c[:3]))
+        return keys.order('-luminance')
     
     elif arrangement_type == 'HUE':
-        return sorted(color_list, key=lambda c: rgb_to_hsv(*c[:3])[0])
+        return keys.order('hue')
     
     elif arrangement_type == 'HUE_LUMINANCE':
         # Group by hue (12 segments), then sort by luminance within each group
-        def hue_lum_key(c):
-            h, s, v = rgb_to_hsv(*c[:3])
-            hue_bucket = int(h * 12)  # 12 hue segments
-            lum = get_luminance(*c[:3])
-            return (hue_bucket, lum)
-        return sorted(color_list, key=hue_lum_key)
+        return keys.order('luminance', 'hue_group')
     
     elif arrangement_type == 'HUE_SATURATION':
         # Group by hue (12 segments), then sort by saturation within each group
-        def hue_sat_key(c):
-            h, s, v = rgb_to_hsv(*c[:3])
-            hue_bucket = int(h * 12)
-            return (hue_bucket, s)
-        return sorted(color_list, key=hue_sat_key)
+        return keys.order('saturation', 'hue_group')
     
     elif arrangement_type == 'SATURATION_ASC':
-        return sorted(color_list, key=lambda c: rgb_to_hsv(*c[:3])[1])
+        return keys.order('saturation')
     
     elif arrangement_type == 'SATURATION_DESC':
-        return sorted(color_list, key=lambda c: -rgb_to_hsv(*c[:3])[1])
+        return keys.order('-saturation')
     
     elif arrangement_type == 'WARM_COOL':
-        return sorted(color_list, key=lambda c: -get_color_temperature(*c[:3]))
+        return keys.order('-temperature')
     
     elif arrangement_type == 'COOL_WARM':
-        return sorted(color_list, key=lambda c: get_color_temperature(*c[:3]))
+        return keys.order('temperature')
     
     elif arrangement_type == 'GRADIENT':
         # Traveling salesman-style ordering for smooth gradients
-        if len(color_list) <= 1:
-            return color_list
-        
-        result = [color_list[0]]
-        remaining = list(color_list[1:])
-        
-        while remaining:
-            last = result[-1]
-            # Find nearest unvisited color
-            nearest_idx = 0
-            nearest_dist = float('inf')
-            for i, c in enumerate(remaining):
-                d = color_distance(last, c)
-                if d < nearest_dist:
-                    nearest_dist = d
-                    nearest_idx = i
-            result.append(remaining.pop(nearest_idx))
-        
-        return result
+        if count <= 1:
+            return np.arange(count)
+        
+        memo_key = ('GRADIENT', metric)
+        if memo_key not in keys.memo:
+            tour_metric = metric
+            if metric == 'DE2000' and count > DE2000_TOUR_LIMIT:
+                tour_metric = 'CIELAB'
+            distances = metric_pairwise_distances(keys.space(tour_metric), tour_metric)
+            keys.memo[memo_key] = gradient_order(distances, start=int(keys.luminance.argmin()))
+        return keys.memo[memo_key]
     
     elif arrangement_type == 'RANDOM':
-        shuffled = list(color_list)
-        random.shuffle(shuffled)
-        return shuffled
+        return np.array(random.sample(range(count), count), dtype=np.intp)
     
     elif arrangement_type == 'SPIRAL':
-        result = [None] * (n * n)
-        x, y = 0, 0
-        dx, dy = 1, 0
-        
-        sorted_colors = sorted(color_list, key=lambda c: get_luminance(*c[:3]))
-        
-        for i in range(min(len(sorted_colors), n * n)):
-            result[y * n + x] = sorted_colors[i]
-            
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < n and 0 <= ny < n and result[ny * n + nx] is None:
-                x, y = nx, ny
-            else:
-                dx, dy = -dy, dx
-                x, y = x + dx, y + dy
-        
-        return [c if c else (0.5, 0.5, 0.5) for c in result]
+        return place_in_cells(keys.order('luminance'), spiral_cells(n), n * n)
     
     elif arrangement_type == 'DIAGONAL':
-        sorted_colors = sorted(color_list, key=lambda c: get_luminance(*c[:3]))
-        result = [None] * (n * n)
-        
-        idx = 0
-        for diag in range(2 * n - 1):
-            for i in range(max(0, diag - n + 1), min(diag + 1, n)):
-                j = diag - i
-                if j < n and idx < len(sorted_colors):
-                    result[i * n + j] = sorted_colors[idx]
-                    idx += 1
-        
-        return [c if c else (0.5, 0.5, 0.5) for c in result]
+        return place_in_cells(keys.order('luminance'), diagonal_cells(n), n * n)
+    
+    elif arrangement_type == 'SMOOTH_GRID':
+        memo_key = ('SMOOTH_GRID', metric, n)
+        if memo_key not in keys.memo:
+            grid = smooth_grid_cells(keys.space(metric), n, n)
+            keys.memo[memo_key] = np.concatenate([grid, np.arange(n * n, count)])
+        return keys.memo[memo_key]
     
     elif arrangement_type == 'CHECKERBOARD':
-        sorted_light = sorted(color_list, key=lambda c: -get_luminance(*c[:3]))
-        sorted_dark = sorted(color_list, key=lambda c: get_luminance(*c[:3]))
-        
-        result = []
-        li, di = 0, 0
-        
-        for row in range(n):
-            for col in range(n):
-                if (row + col) % 2 == 0:
-                    if li < len(sorted_light):
-                        result.append(sorted_light[li])
-                        li += 1
-                    else:
-                        result.append((0.8, 0.8, 0.8))
-                else:
-                    if di < len(sorted_dark):
-                        result.append(sorted_dark[di])
-                        di += 1
-                    else:
-                        result.append((0.2, 0.2, 0.2))
-        
-        return result
+        # Lightest colors on the light squares, darkest on the dark ones
+        rows, cols = np.divmod(np.arange(n * n), n)
+        dark_square = (rows + cols) % 2 == 1
+        light = place_in_cells(keys.order('-luminance'), np.flatnonzero(~dark_square), n * n, fill=-2)
+        dark = place_in_cells(keys.order('luminance'), np.flatnonzero(dark_square), n * n, fill=-3)
+        return np.where(dark_square, dark, light)
+    
+    return np.arange(count)
+
+
+def arrange_colors(colors, arrangement_type, grid_size, metric='OKLAB'):
+    """Arrange colors according to specified pattern - with new compound arrangements.
+
+    ``metric`` selects the color difference used by GRADIENT and SMOOTH_GRID.
+    """
+    color_list = list(colors)
+    
+    if arrangement_type == 'ORIGINAL' or len(color_list) == 0:
+        return color_list
     
-    return color_list
+    keys = PaletteKeyCache().get(color_list)
+    indices = arrangement_indices(keys, arrangement_type, grid_size, metric)
+    return [color_list[i] if i >= 0 else ARRANGEMENT_FILL[i] for i in indices.tolist()]
+
+
+def arrangement_gallery(colors, grid_size, metric='OKLAB'):
+    """Every arrangement of a palette at once, as {arrangement id: colors}.
+
+    All arrangements share one PaletteKeys table, so the whole gallery
+    costs little more than its most expensive member.
+    """
+    return {
+        identifier: arrange_colors(colors, identifier, grid_size, metric)
+        for identifier, *_ in ARRANGEMENT_TYPES
+    }
 
 
 def expand_colors_to_grid(colors, target_count):
-    """Expand a list of colors to fill the target count intelligently."""
+    """Expand a list of colors to fill the target count intelligently.
+
+    Extra cells cycle through the originals, alternately lightened and
+    darkened a little more on each pass.
+    """
     if len(colors) == 0:
         return [(0.5, 0.5, 0.5)] * target_count
     
     if len(colors) >= target_count:
         return list(colors[:target_count])
     
-    result = list(colors)
     original_count = len(colors)
+    position = np.arange(original_count, target_count)
+    variation_index = position // original_count
+    step = 0.15 * (variation_index // 2 + 1)
+    lighten = variation_index % 2 == 0
     
-    while len(result) < target_count:
-        for i in range(original_count):
-            if len(result) >= target_count:
-                break
-            
-            r, g, b = colors[i][:3]
-            h, s, v = rgb_to_hsv(r, g, b)
-            
-            variation_index = len(result) // original_count
-            if variation_index % 2 == 0:
-                new_v = clamp(v * (1.0 + 0.15 * (variation_index // 2 + 1)))
-                new_s = clamp(s * 0.9)
-            else:
-                new_v = clamp(v * (1.0 - 0.15 * (variation_index // 2 + 1)))
-                new_s = clamp(s * 1.1)
-            
-            result.append(hsv_to_rgb(h, new_s, new_v))
+    hsv = rgb_to_hsv_array(as_color_array(colors))[position % original_count]
+    hsv[:, 1] = np.clip(hsv[:, 1] * np.where(lighten, 0.9, 1.1), 0.0, 1.0)
+    hsv[:, 2] = np.clip(hsv[:, 2] * np.where(lighten, 1.0 + step, 1.0 - step), 0.0, 1.0)
     
-    return result[:target_count]
+    return list(colors) + color_tuples(hsv_to_rgb_array(hsv))
 
 
 # ============================================================================
-# OPTIMIZED IMAGE EXTRACTION FUNCTIONS
+# IMAGE COLOR HISTOGRAMS
 # ============================================================================
+# Extraction runs on a 3D color histogram of the whole image instead of a
+# random pixel sample. The histogram is built in one bincount pass per
+# decode chunk, and the extractors cluster its occupied bins weighted by
+# pixel count, so their cost follows the number of distinct colors rather
+# than the number of pixels.
+
+# Bits per channel used to bin colors (5 bits = 32 levels, 32768 bins)
+HISTOGRAM_BITS = 5
+# Pixels binned per bincount call while building a histogram
+HISTOGRAM_CHUNK_PIXELS = 1 << 22
+DEFAULT_PIXEL_CACHE_MB = 256
+
+
+def read_image_pixels(img):
+    """Read an image into a (height, width, 4) float32 array.
+
+    The pixels are copied straight into one preallocated buffer with
+    foreach_get; going through ``img.pixels[:]`` would first box every
+    channel value as a Python float.
+    """
+    width, height = img.size
+    if width == 0 or height == 0:
+        raise RuntimeError(f"Could not decode image '{img.name}'")
+    
+    buf = np.empty(width * height * 4, dtype=np.float32)
+    img.pixels.foreach_get(buf)
+    return buf.reshape(height, width, 4)
 
-def downsample_pixels(pixels, max_samples=5000):
-    """Downsample pixel array for faster processing."""
-    if len(pixels) <= max_samples:
-        return pixels
-    indices = np.random.choice(len(pixels), max_samples, replace=False)
-    return pixels[indices]
 
+class ColorHistogram:
+    """Occupied bins of a 3D color histogram.
 
-def extract_colors_kmeans(image_path, num_colors, max_samples=5000, max_iters=10):
-    """Extract colors using K-means clustering - optimized."""
-    try:
-        img = bpy.data.images.load(image_path)
-        pixels = np.array(img.pixels[:]).reshape(-1, 4)
-        rgb_pixels = pixels[:, :3]
-        
-        # Filter by alpha
-        alpha = pixels[:, 3]
-        rgb_pixels = rgb_pixels[alpha > 0.1]
+    ``levels`` holds each bin's integer (r, g, b) coordinates, ``counts``
+    the number of pixels that fell in it and ``colors`` their mean color.
+    """
+    
+    def __init__(self, bits, levels, counts, colors):
+        self.bits = bits
+        self.levels = levels
+        self.counts = counts
+        self.colors = colors
+    
+    def __len__(self):
+        return len(self.counts)
+    
+    @property
+    def nbytes(self):
+        return self.levels.nbytes + self.counts.nbytes + self.colors.nbytes
+
+
+def build_color_histogram(pixels, bits=HISTOGRAM_BITS, alpha_threshold=0.1, progress=None):
+    """Bin (N, 4) RGBA pixels into a ColorHistogram.
+
+    Pixels at or below ``alpha_threshold`` are skipped unless it is None.
+    Work is done in chunks of HISTOGRAM_CHUNK_PIXELS so temporaries stay
+    small even for 16K images. ``progress(fraction)`` is called per chunk.
+    """
+    size = 1 << bits
+    num_bins = size ** 3
+    counts = np.zeros(num_bins, dtype=np.float64)
+    sums = np.zeros((3, num_bins), dtype=np.float64)
+    
+    for start in range(0, len(pixels), HISTOGRAM_CHUNK_PIXELS):
+        if progress is not None:
+            progress(start / len(pixels))
+        chunk = pixels[start:start + HISTOGRAM_CHUNK_PIXELS]
+        if alpha_threshold is not None:
+            chunk = chunk[chunk[:, 3] > alpha_threshold]
+        if len(chunk) == 0:
+            continue
         
-        if len(rgb_pixels) == 0:
-            bpy.data.images.remove(img)
-            return [(0.5, 0.5, 0.5)] * num_colors
-        
-        # Downsample for speed
-        rgb_pixels = downsample_pixels(rgb_pixels, max_samples)
-        
-        # Initialize centers using k-means++
-        centers = [rgb_pixels[np.random.randint(len(rgb_pixels))]]
-        for _ in range(num_colors - 1):
-            dists = np.min([np.sum((rgb_pixels - c) ** 2, axis=1) for c in centers], axis=0)
-            probs = dists / dists.sum()
-            centers.append(rgb_pixels[np.random.choice(len(rgb_pixels), p=probs)])
-        centers = np.array(centers)
-        
-        # K-means iterations (reduced)
-        for _ in range(max_iters):
-            distances = np.sqrt(((rgb_pixels[:, None] - centers) ** 2).sum(axis=2))
-            labels = distances.argmin(axis=1)
-            
-            new_centers = np.array([
-                rgb_pixels[labels == k].mean(axis=0) if (labels == k).sum() > 0 else centers[k]
-                for k in range(num_colors)
-            ])
-            
-            if np.allclose(centers, new_centers, atol=0.01):
-                break
-            centers = new_centers
+        rgb = chunk[:, :3]
+        level = np.clip((rgb * size).astype(np.int32), 0, size - 1)
+        key = (level[:, 0] << (2 * bits)) | (level[:, 1] << bits) | level[:, 2]
         
-        bpy.data.images.remove(img)
-        return [tuple(c) for c in centers]
+        counts += np.bincount(key, minlength=num_bins)
+        for channel in range(3):
+            sums[channel] += np.bincount(key, weights=rgb[:, channel], minlength=num_bins)
     
-    except Exception as e:
-        print(f"[UPP] K-means extraction error: {e}")
-        return [(0.5, 0.5, 0.5)] * num_colors
+    occupied = np.flatnonzero(counts)
+    levels = np.stack([
+        occupied >> (2 * bits), (occupied >> bits) & (size - 1), occupied & (size - 1)
+    ], axis=1).astype(np.uint8)
+    occupied_counts = counts[occupied]
+    colors = (sums[:, occupied] / occupied_counts).T
+    
+    return ColorHistogram(
+        bits,
+        levels,
+        occupied_counts.astype(np.float32),
+        np.ascontiguousarray(colors, dtype=np.float32),
+    )
 
 
-def extract_colors_median_cut(image_path, num_colors, max_samples=5000):
-    """Extract colors using median cut algorithm - optimized."""
+def decode_image_pixels(image_path):
+    """Decode an image file into an (N, 4) float32 RGBA array."""
+    img = bpy.data.images.load(image_path)
     try:
-        img = bpy.data.images.load(image_path)
-        pixels = np.array(img.pixels[:]).reshape(-1, 4)
-        rgb_pixels = pixels[:, :3]
-        
-        alpha = pixels[:, 3]
-        rgb_pixels = rgb_pixels[alpha > 0.1]
-        
-        if len(rgb_pixels) == 0:
-            bpy.data.images.remove(img)
-            return [(0.5, 0.5, 0.5)] * num_colors
-        
-        rgb_pixels = downsample_pixels(rgb_pixels, max_samples)
+        pixels = read_image_pixels(img)
+    finally:
+        bpy.data.images.remove(img)
+    
+    return pixels.reshape(-1, 4)
+
+
+def load_color_histogram(image_path, bits=HISTOGRAM_BITS, alpha_threshold=0.1):
+    """Decode an image and build the histogram of all of its pixels."""
+    return build_color_histogram(decode_image_pixels(image_path), bits, alpha_threshold)
+
+
+class ImageColorCache:
+    """LRU cache of image color histograms shared by all extractors (Singleton).
+
+    Entries are keyed by (absolute path, mtime, file size, histogram bits,
+    alpha filter), so an edited file is decoded again while switching
+    algorithm or grid size reuses the histogram already in memory. The
+    memory budget comes from the addon preferences.
+    """
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if not self.initialized:
+            self.entries = OrderedDict()
+            self.nbytes = 0
+            self.initialized = True
+    
+    @staticmethod
+    def budget():
+        """Cache budget in bytes."""
+        prefs = get_addon_preferences()
+        megabytes = prefs.pixel_cache_mb if prefs else DEFAULT_PIXEL_CACHE_MB
+        return megabytes * 1024 * 1024
+    
+    @staticmethod
+    def make_key(image_path, bits, alpha_threshold):
+        path = os.path.abspath(image_path)
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size, bits, alpha_threshold)
+    
+    def lookup(self, key):
+        """Return the histogram cached under ``key``, or None."""
+        histogram = self.entries.get(key)
+        if histogram is not None:
+            self.entries.move_to_end(key)
+        return histogram
+    
+    def store(self, key, histogram):
+        """Cache a histogram built for ``key``."""
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous.nbytes
+        self.entries[key] = histogram
+        self.nbytes += histogram.nbytes
+        self.trim()
+    
+    def get_histogram(self, image_path, bits=HISTOGRAM_BITS, alpha_threshold=0.1):
+        """Return the cached histogram for an image, decoding it on a miss."""
+        key = self.make_key(image_path, bits, alpha_threshold)
+        
+        histogram = self.lookup(key)
+        if histogram is None:
+            histogram = load_color_histogram(key[0], bits, alpha_threshold)
+            self.store(key, histogram)
+        return histogram
+    
+    def trim(self, budget=None):
+        """Evict least recently used entries until the cache fits its budget."""
+        budget = self.budget() if budget is None else budget
+        while self.entries and self.nbytes > budget:
+            _, histogram = self.entries.popitem(last=False)
+            self.nbytes -= histogram.nbytes
+    
+    def clear(self):
+        """Drop every cached histogram."""
+        self.entries.clear()
+        self.nbytes = 0
+
+
+def get_color_histogram(image_path, bits=HISTOGRAM_BITS, alpha_threshold=0.1):
+    """Return an image's color histogram through the shared cache."""
+    return ImageColorCache().get_histogram(image_path, bits, alpha_threshold)
+
+
+# ============================================================================
+# OPTIMIZED IMAGE EXTRACTION FUNCTIONS
+# ============================================================================
+
+# Upper bound on the (points x centers) float32 distance block, in elements
+KMEANS_BLOCK_ELEMENTS = 1 << 22
+
+
+def squared_norms(points):
+    """Row-wise squared Euclidean norms."""
+    return (points * points).sum(axis=1)
+
+
+def squared_distance_to(points, center, point_sq=None):
+    """Squared Euclidean distance from every point to a single center.
+
+    Pass ``point_sq = squared_norms(points)`` when calling repeatedly on
+    the same points.
+    """
+    if point_sq is None:
+        point_sq = squared_norms(points)
+    d = points @ center
+    d *= -2.0
+    d += point_sq
+    d += center @ center
+    return np.maximum(d, 0.0, out=d)
+
+
+def assign_to_centers(points, centers):
+    """Return each point's nearest center and squared distance to it.
+
+    Distances are evaluated in float32 blocks of at most
+    KMEANS_BLOCK_ELEMENTS, using |x|^2 - 2x.c + |c|^2 so no (N, k, 3)
+    difference tensor is ever built, and no square root is taken.
+    """
+    num_points = len(points)
+    center_sq = squared_norms(centers)
+    chunk = max(1, KMEANS_BLOCK_ELEMENTS // max(len(centers), 1))
+    
+    labels = np.empty(num_points, dtype=np.intp)
+    distances = np.empty(num_points, dtype=np.float32)
+    
+    for start in range(0, num_points, chunk):
+        block = points[start:start + chunk]
+        d = block @ centers.T
+        d *= -2.0
+        d += center_sq
+        nearest = d.argmin(axis=1)
+        labels[start:start + chunk] = nearest
+        distances[start:start + chunk] = (
+            d[np.arange(len(block)), nearest] + squared_norms(block)
+        )
+    
+    np.maximum(distances, 0.0, out=distances)
+    return labels, distances
+
+
+# Palette size above which K-means starts from Wu boxes instead of k-means++
+KMEANS_SEEDED_ABOVE = 256
+# Lloyd iterations for Wu-seeded K-means, which starts close to converged
+KMEANS_SEEDED_ITERS = 3
+# Restarts per extraction when the addon preferences are unavailable
+DEFAULT_KMEANS_RESTARTS = 4
+
+
+def kmeans_plus_plus(points, k, weights, rng=np.random):
+    """Pick k initial centers with weighted k-means++ seeding.
+
+    The nearest-center distance of every point is updated incrementally,
+    so seeding costs O(N k) rather than recomputing all distances per pick.
+    """
+    point_sq = squared_norms(points)
+    centers = np.empty((k, points.shape[1]), dtype=np.float32)
+    centers[0] = points[rng.randint(len(points))]
+    min_dist = squared_distance_to(points, centers[0], point_sq)
+    
+    for i in range(1, k):
+        cumulative = np.cumsum(min_dist * weights, dtype=np.float64)
+        if cumulative[-1] > 0:
+            idx = int(np.searchsorted(cumulative, rng.random_sample() * cumulative[-1], side='right'))
+            idx = min(idx, len(points) - 1)
+        else:
+            idx = rng.randint(len(points))
+        centers[i] = points[idx]
+        np.minimum(min_dist, squared_distance_to(points, centers[i], point_sq), out=min_dist)
+    
+    return centers
+
+
+def kmeans(points, k, weights=None, max_iters=10, tol=0.01, rng=np.random, progress=None,
+           initial=None):
+    """Cluster (optionally weighted) points into k centers with Lloyd's algorithm.
+
+    Returns (centers, inertia). Centroids are updated with np.bincount
+    instead of a boolean mask per cluster; empty clusters are re-seeded
+    on the points farthest from their current center. ``initial``
+    centers replace k-means++ seeding.
+    """
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    if weights is None:
+        weights = np.ones(len(points), dtype=np.float32)
+    if initial is None:
+        centers = kmeans_plus_plus(points, k, weights, rng)
+    else:
+        centers = np.array(initial, dtype=np.float32)
+    
+    for iteration in range(max_iters):
+        if progress is not None:
+            progress(iteration / max_iters)
+        labels, distances = assign_to_centers(points, centers)
+        
+        mass = np.bincount(labels, weights=weights, minlength=k)
+        new_centers = np.empty_like(centers)
+        for channel in range(points.shape[1]):
+            new_centers[:, channel] = np.bincount(
+                labels, weights=points[:, channel] * weights, minlength=k
+            )
         
-        def median_cut_recursive(pxls, depth):
-            if depth == 0 or len(pxls) == 0:
-                return [pxls.mean(axis=0)] if len(pxls) > 0 else [np.array([0.5, 0.5, 0.5])]
-            
-            ranges = pxls.max(axis=0) - pxls.min(axis=0)
-            channel = ranges.argmax()
-            
-            sorted_pxls = pxls[pxls[:, channel].argsort()]
-            mid = len(sorted_pxls) // 2
-            
-            return (median_cut_recursive(sorted_pxls[:mid], depth - 1) +
-                    median_cut_recursive(sorted_pxls[mid:], depth - 1))
+        filled = mass > 0
+        new_centers[filled] /= mass[filled, None]
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            # More empty clusters than points leaves the rest where they were
+            new_centers[empty] = centers[empty]
+            reseed = min(len(empty), len(points))
+            farthest = np.argpartition(distances, -reseed)[-reseed:]
+            new_centers[empty[:reseed]] = points[farthest]
+        
+        shift = np.abs(new_centers - centers).max()
+        centers = new_centers
+        if shift < tol and not len(empty):
+            break
+    
+    _, distances = assign_to_centers(points, centers)
+    return centers, float(distances @ weights)
+
+
+def cluster_kmeans(histogram, num_colors, progress=None, max_iters=10, metric='RGB',
+                   restarts=DEFAULT_KMEANS_RESTARTS, workers=1):
+    """Palette from the best of several K-means restarts on the histogram bins.
+
+    Clustering runs in the coordinates of ``metric`` (CIELAB for
+    CIEDE2000, whose centroids are not defined); each palette color is
+    the RGB mean of the bins in its cluster. Above KMEANS_SEEDED_ABOVE
+    colors, k-means++ restarts give way to one short run seeded from the
+    Wu quantizer's boxes; below it, ``restarts`` runs share ``workers``.
+    Like the other extractors it returns at most one color per histogram
+    bin, leaving expand_colors_to_grid to pad the rest.
+    """
+    points = to_metric_space(histogram.colors, metric)
+    num_colors = min(num_colors, len(points))
+    if num_colors > KMEANS_SEEDED_ABOVE:
+        seeds = to_metric_space(cluster_wu(histogram, num_colors), metric)
+        centers, _ = kmeans(points, len(seeds), histogram.counts, max_iters=KMEANS_SEEDED_ITERS,
+                            progress=progress, initial=seeds)
+    else:
+        centers = kmeans_restarts(points, num_colors, histogram.counts, restarts,
+                                  max_iters=max_iters, progress=progress, workers=workers)
+    if metric == 'RGB':
+        return centers
+    
+    labels, _ = assign_to_centers(points, centers)
+    mass = np.bincount(labels, weights=histogram.counts, minlength=len(centers))
+    filled = mass > 0
+    colors = np.stack([
+        np.bincount(labels, weights=histogram.colors[:, channel] * histogram.counts, minlength=len(centers))
+        for channel in range(3)
+    ], axis=1)
+    return colors[filled] / mass[filled, None]
+
+
+def cluster_median_cut(histogram, num_colors, progress=None):
+    """Palette from median cut of the histogram bins.
+
+    Boxes wait in a priority queue keyed on their summed squared error
+    (variance times population), and the worst box is always split next
+    until exactly ``num_colors`` boxes exist. Each split is at the weighted
+    median of the box's widest channel, found with a bincount over its
+    integer bin levels, so nothing is sorted. Colors are returned in order
+    of population.
+    """
+    levels = histogram.levels
+    colors = histogram.colors.astype(np.float64)
+    counts = histogram.counts.astype(np.float64)
+    num_levels = 1 << histogram.bits
+    tiebreak = itertools.count()
+    
+    def make_box(indices):
+        weights = counts[indices]
+        population = weights.sum()
+        mean = weights @ colors[indices] / population
+        error = weights @ ((colors[indices] - mean) ** 2).sum(axis=1)
+        return (-error, next(tiebreak), indices, population, mean)
+    
+    queue = [make_box(np.arange(len(counts)))]
+    finished = []
+    
+    while queue and len(queue) + len(finished) < num_colors:
+        if progress is not None:
+            progress((len(queue) + len(finished)) / num_colors)
+        
+        box = heapq.heappop(queue)
+        indices = box[2]
+        box_levels = levels[indices]
+        low, high = box_levels.min(axis=0), box_levels.max(axis=0)
+        channel = int((high - low).argmax())
+        if high[channel] == low[channel]:
+            finished.append(box)
+            continue
         
-        depth = int(np.ceil(np.log2(num_colors)))
-        colors = median_cut_recursive(rgb_pixels, depth)
+        channel_levels = box_levels[:, channel]
+        cumulative = np.cumsum(np.bincount(channel_levels, weights=counts[indices], minlength=num_levels))
+        cut = int(np.searchsorted(cumulative, cumulative[-1] / 2))
+        cut = min(max(cut, int(low[channel])), int(high[channel]) - 1)
         
-        bpy.data.images.remove(img)
-        return [tuple(c) for c in colors[:num_colors]]
+        lower = channel_levels <= cut
+        heapq.heappush(queue, make_box(indices[lower]))
+        heapq.heappush(queue, make_box(indices[~lower]))
     
-    except Exception as e:
-        print(f"[UPP] Median cut extraction error: {e}")
-        return [(0.5, 0.5, 0.5)] * num_colors
+    boxes = sorted(finished + queue, key=lambda box: box[3], reverse=True)
+    return np.array([box[4] for box in boxes], dtype=np.float32)
 
 
-def extract_colors_dominant(image_path, num_colors, max_samples=8000):
-    """Extract dominant (most frequent) colors - optimized."""
-    try:
-        img = bpy.data.images.load(image_path)
-        pixels = np.array(img.pixels[:]).reshape(-1, 4)
-        rgb_pixels = pixels[:, :3]
-        
-        rgb_pixels = downsample_pixels(rgb_pixels, max_samples)
+# OKLab distance below which two dominant colors count as the same color
+DOMINANT_MERGE_DISTANCE = 0.04
+
+
+def cluster_dominant(histogram, num_colors, progress=None):
+    """Palette of the most frequent colors, with near-duplicates merged.
+
+    Bins are visited from most to least frequent and kept only if they
+    are at least DOMINANT_MERGE_DISTANCE (OKLab) from every kept color.
+    Every bin within that distance of a kept color is then folded into
+    it, so each returned color is the mean of all the pixels it stands
+    for. Images too uniform to yield ``num_colors`` distinct colors are
+    topped up with the most frequent remaining bins. Colors are returned
+    by merged pixel count.
+    """
+    lab = srgb_to_oklab(histogram.colors)
+    threshold = DOMINANT_MERGE_DISTANCE ** 2
+    
+    order = np.argsort(histogram.counts, kind='stable')[::-1]
+    kept = np.empty((num_colors, 3), dtype=np.float32)
+    picks = []
+    for index in order.tolist():
+        if picks:
+            offsets = kept[:len(picks)] - lab[index]
+            if (offsets * offsets).sum(axis=1).min() < threshold:
+                continue
+        kept[len(picks)] = lab[index]
+        picks.append(index)
+        if progress is not None:
+            progress(len(picks) / num_colors)
+        if len(picks) == num_colors:
+            break
+    
+    if len(picks) < num_colors:
+        skipped = order[~np.isin(order, picks)][:num_colors - len(picks)]
+        kept[len(picks):len(picks) + len(skipped)] = lab[skipped]
+        picks.extend(skipped.tolist())
+    
+    labels, distances = assign_to_centers(lab, kept[:len(picks)])
+    weights = np.where(distances < threshold, histogram.counts, 0.0)
+    weights[picks] = histogram.counts[picks]
+    
+    mass = np.bincount(labels, weights=weights, minlength=len(picks))
+    colors = np.stack([
+        np.bincount(labels, weights=histogram.colors[:, channel] * weights, minlength=len(picks))
+        for channel in range(3)
+    ], axis=1) / mass[:, None]
+    
+    return colors[np.argsort(mass, kind='stable')[::-1]]
+
+
+def cluster_diverse(histogram, num_colors, progress=None, metric='RGB'):
+    """Palette of visually diverse colors, picked farthest-first.
+
+    Every bin's squared distance to its nearest pick is kept up to date,
+    so each new pick costs one O(N) update. ``metric`` selects RGB,
+    OKLab, CIELAB or CIEDE2000 distances.
+    """
+    colors = histogram.colors
+    points = to_metric_space(colors, metric)
+    point_sq = squared_norms(points)
+    
+    # Start with the most common color
+    picks = [int(histogram.counts.argmax())]
+    min_distances = metric_distance_to(points, points[picks[0]], metric, point_sq)
+    min_distances[picks[0]] = 0.0
+    
+    for i in range(1, min(num_colors, len(points))):
+        if progress is not None:
+            progress(i / num_colors)
+        
+        pick = int(min_distances.argmax())
+        picks.append(pick)
+        np.minimum(min_distances, metric_distance_to(points, points[pick], metric, point_sq), out=min_distances)
+        min_distances[pick] = 0.0
+    
+    return colors[picks]
+
+
+def wu_moments(histogram):
+    """Cumulative Wu moment table of a histogram.
+
+    Returns a ((2^bits + 1)^3, 5) table whose entry [r, g, b] holds the
+    pixel count, the r/g/b sums and the sum of squared magnitudes over all
+    bins with levels below (r, g, b). Index 0 on each axis is a zero row,
+    so any box sum takes eight lookups.
+    """
+    size = (1 << histogram.bits) + 1
+    weighted = histogram.colors * histogram.counts[:, None]
+    
+    moments = np.zeros((size, size, size, 5), dtype=np.float64)
+    r, g, b = (histogram.levels.astype(np.intp) + 1).T
+    moments[r, g, b, 0] = histogram.counts
+    moments[r, g, b, 1:4] = weighted
+    moments[r, g, b, 4] = (weighted * histogram.colors).sum(axis=1)
+    
+    for axis in range(3):
+        np.cumsum(moments, axis=axis, out=moments)
+    return moments
+
+
+def wu_box_moments(moments, box):
+    """Moments inside box (r0, r1] x (g0, g1] x (b0, b1].
+
+    Any bound may be an integer array, giving one row of moments per
+    candidate box.
+    """
+    r0, r1, g0, g1, b0, b1 = box
+    return (moments[r1, g1, b1] - moments[r1, g1, b0] - moments[r1, g0, b1] + moments[r1, g0, b0]
+            - moments[r0, g1, b1] + moments[r0, g1, b0] + moments[r0, g0, b1] - moments[r0, g0, b0])
+
+
+def wu_variance(box_moments):
+    """Sum of squared errors of a box around its mean color."""
+    weight = box_moments[0]
+    if weight <= 0:
+        return 0.0
+    return box_moments[4] - (box_moments[1:4] @ box_moments[1:4]) / weight
+
+
+def wu_best_cut(moments, box, whole):
+    """Find the split of ``box`` that most reduces the total variance.
+
+    Every cut position on all three axes is scored at once. Returns
+    (axis, position), or None when the box cannot be split.
+    """
+    best_score, best_cut = -np.inf, None
+    
+    for axis in range(3):
+        low, high = box[2 * axis], box[2 * axis + 1]
+        if high - low < 2:
+            continue
         
-        # Quantize to reduce unique colors (5-bit per channel = 32K colors max)
-        quantized = (rgb_pixels * 31).astype(np.uint8)
+        cuts = np.arange(low + 1, high)
+        lower_box = list(box)
+        lower_box[2 * axis + 1] = cuts
+        lower = wu_box_moments(moments, lower_box)
+        upper = whole - lower
         
-        # Pack into single int for faster unique counting
-        packed = quantized[:, 0].astype(np.uint32) << 16 | quantized[:, 1].astype(np.uint32) << 8 | quantized[:, 2]
-        unique, counts = np.unique(packed, return_counts=True)
+        valid = (lower[:, 0] > 0) & (upper[:, 0] > 0)
+        if not valid.any():
+            continue
         
-        # Get top colors
-        top_indices = counts.argsort()[-num_colors:][::-1]
-        top_packed = unique[top_indices]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = ((lower[:, 1:4] ** 2).sum(axis=1) / lower[:, 0] +
+                     (upper[:, 1:4] ** 2).sum(axis=1) / upper[:, 0])
+        score[~valid] = -np.inf
         
-        colors = []
-        for p in top_packed:
-            r = ((p >> 16) & 0xFF) / 31.0
-            g = ((p >> 8) & 0xFF) / 31.0
-            b = (p & 0xFF) / 31.0
-            colors.append((r, g, b))
+        i = int(score.argmax())
+        if score[i] > best_score:
+            best_score, best_cut = score[i], (axis, int(cuts[i]))
+    
+    return best_cut
+
+
+def cluster_wu(histogram, num_colors, progress=None):
+    """Palette from Xiaolin Wu's greedy orthogonal bipartition quantizer.
+
+    The color cube is cut into boxes, always splitting the box with the
+    largest variance at the plane that minimizes the summed variance of
+    its halves. Cumulative moments make every box sum O(1) and boxes wait
+    in a priority queue keyed on variance, so the cost is one pass over
+    the histogram plus O(num_colors * bins per axis).
+    """
+    moments = wu_moments(histogram)
+    size = moments.shape[0] - 1
+    
+    boxes = [[0, size, 0, size, 0, size]]
+    sums = [wu_box_moments(moments, boxes[0])]
+    queue = [(-wu_variance(sums[0]), 0)]
+    
+    while len(boxes) < num_colors and queue:
+        if progress is not None:
+            progress(len(boxes) / num_colors)
+        
+        # Split the highest-variance box; boxes that cannot be split drop out
+        negative_variance, i = heapq.heappop(queue)
+        if negative_variance >= 0:
+            break
+        cut = wu_best_cut(moments, boxes[i], sums[i])
+        if cut is None:
+            continue
         
-        bpy.data.images.remove(img)
-        return colors
+        axis, position = cut
+        upper_box = list(boxes[i])
+        boxes[i][2 * axis + 1] = position
+        upper_box[2 * axis] = position
+        
+        lower = wu_box_moments(moments, boxes[i])
+        upper = sums[i] - lower
+        sums[i] = lower
+        boxes.append(upper_box)
+        sums.append(upper)
+        heapq.heappush(queue, (-wu_variance(lower), i))
+        heapq.heappush(queue, (-wu_variance(upper), len(boxes) - 1))
+    
+    sums = np.array(sums)
+    return sums[:, 1:4] / sums[:, :1]
+
+
+# Histogram clustering function for each extraction algorithm
+HISTOGRAM_EXTRACTORS = {
+    'KMEANS': cluster_kmeans,
+    'MEDIAN_CUT': cluster_median_cut,
+    'DOMINANT': cluster_dominant,
+    'DIVERSE': cluster_diverse,
+    'WU': cluster_wu,
+}
+
+# Algorithms whose clustering honors the color metric setting
+METRIC_EXTRACTORS = {'KMEANS', 'DIVERSE'}
+
+
+def extract_palette(histogram, algorithm, num_colors, progress=None, metric='RGB',
+                    restarts=DEFAULT_KMEANS_RESTARTS, workers=1):
+    """Cluster a histogram into at most ``num_colors`` RGB tuples.
+
+    Pure NumPy, so it is safe to run on a worker thread. ``restarts`` and
+    ``workers`` configure K-means; read them on the main thread with
+    prepare_extraction.
+    """
+    if len(histogram) == 0:
+        return [(0.5, 0.5, 0.5)] * num_colors
+    
+    cluster = HISTOGRAM_EXTRACTORS.get(algorithm, cluster_diverse)
+    options = {'metric': metric} if algorithm in METRIC_EXTRACTORS else {}
+    if algorithm == 'KMEANS':
+        options.update(restarts=restarts, workers=workers)
+    colors = cluster(histogram, num_colors, progress=progress, **options)
+    return [tuple(c) for c in np.asarray(colors, dtype=np.float64).tolist()]
+
+
+def extract_colors(image_path, algorithm, num_colors, metric='RGB'):
+    """Extract a palette from an image file with the given algorithm."""
+    try:
+        histogram = get_color_histogram(image_path)
+        options = prepare_extraction(algorithm, num_colors)
+        return extract_palette(histogram, algorithm, num_colors, metric=metric, **options)
     
     except Exception as e:
-        print(f"[UPP] Dominant extraction error: {e}")
+        print(f"[UPP] {algorithm} extraction error: {e}")
         return [(0.5, 0.5, 0.5)] * num_colors
 
 
-def extract_colors_diverse(image_path, num_colors, max_samples=3000):
-    """Extract visually diverse colors - optimized."""
+# ============================================================================
+# PARALLEL EXTRACTION
+# ============================================================================
+#
+# K-means restarts are independent, so they run side by side in a process
+# pool. The points and weights are placed in shared memory once and the
+# workers attach to them by name, instead of each task pickling its own
+# copy.
+#
+# Worker processes are forked from Blender. A fork copies only the calling
+# thread, so any lock another thread holds at that moment stays locked in
+# the child forever. The pool is therefore started from the main thread by
+# prepare_extraction, before the extraction job exists, and all of its
+# processes are launched right away; the job thread only submits work.
+# The spawn start method would avoid forking altogether, but a spawned
+# interpreter must import this module to find the worker function, and
+# the module imports bpy, which only exists inside Blender. Where forking
+# is not available (Windows, macOS) restarts run on threads in-process
+# instead, which still overlap because NumPy releases the GIL.
+#
+# Only the k-means++ restarts are spread out. Palettes above
+# KMEANS_SEEDED_ABOVE colors run a single Wu-seeded K-means instead, which
+# the pool does not split; its cost is the assignment step's matrix
+# product, which a threaded BLAS already runs on every core.
+
+
+def prepare_extraction(algorithm, num_colors):
+    """Extraction options from the addon preferences, for ``extract_palette``.
+
+    Reads bpy, so it must run on the main thread; the returned dict is
+    passed on to the worker. When the K-means restarts will use the
+    process pool, the pool is started here as well.
+    """
+    prefs = get_addon_preferences()
+    restarts = prefs.kmeans_restarts if prefs else DEFAULT_KMEANS_RESTARTS
+    workers = (prefs.extraction_workers if prefs else 0) or os.cpu_count() or 1
+    
+    if algorithm == 'KMEANS' and num_colors <= KMEANS_SEEDED_ABOVE and restarts > 1:
+        ExtractionPool().start(min(workers, restarts))
+    return {'restarts': restarts, 'workers': workers}
+
+
+class SharedArray:
+    """A copy of a NumPy array in a named shared memory block.
+
+    ``spec`` is a small picklable (name, shape, dtype) tuple that worker
+    processes pass to ``attach_shared_array``. The block is unlinked when
+    the ``with`` block exits.
+    """
+    
+    def __init__(self, array):
+        array = np.ascontiguousarray(array)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=self.shm.buf)[...] = array
+        self.spec = (self.shm.name, array.shape, array.dtype.str)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shm.close()
+        self.shm.unlink()
+        return False
+
+
+def attach_shared_array(spec):
+    """Read a SharedArray from a worker process.
+
+    Only the creating process may unlink the block. Before Python 3.13
+    attaching always registers it with the resource tracker, which is why
+    ExtractionPool forks its workers onto the parent's tracker: there the
+    registration is a duplicate that the parent's unlink clears.
+    """
+    name, shape, dtype = spec
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        shm = shared_memory.SharedMemory(name=name)
     try:
-        img = bpy.data.images.load(image_path)
-        pixels = np.array(img.pixels[:]).reshape(-1, 4)
-        rgb_pixels = pixels[:, :3]
-        
-        alpha = pixels[:, 3]
-        rgb_pixels = rgb_pixels[alpha > 0.1]
-        
-        if len(rgb_pixels) == 0:
-            bpy.data.images.remove(img)
-            return [(0.5, 0.5, 0.5)] * num_colors
-        
-        rgb_pixels = downsample_pixels(rgb_pixels, max_samples)
-        
-        # Start with random color
-        colors = [rgb_pixels[np.random.randint(len(rgb_pixels))]]
+        return np.ndarray(shape, dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+
+def kmeans_run(points, weights, k, max_iters, seed):
+    """One seeded K-means restart; returns (centers, inertia)."""
+    return kmeans(points, k, weights, max_iters=max_iters, rng=np.random.RandomState(seed))
+
+
+def kmeans_run_shared(points_spec, weights_spec, k, max_iters, seed):
+    """Process pool entry point for ``kmeans_run``."""
+    return kmeans_run(attach_shared_array(points_spec), attach_shared_array(weights_spec),
+                      k, max_iters, seed)
+
+
+class ExtractionPool:
+    """Lazily created process pool for extraction work (Singleton)."""
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if not self.initialized:
+            self.executor = None
+            self.workers = 0
+            self.available = (
+                "fork" in multiprocessing.get_all_start_methods()
+                and sys.platform != "darwin"
+            )
+            self.initialized = True
+    
+    def start(self, workers):
+        """Fork a pool of ``workers`` processes. Main thread only.
+
+        A pool of another size is replaced; work already queued on it
+        still completes.
+        """
+        if not self.available or workers < 2:
+            return
         
-        for _ in range(num_colors - 1):
-            # Vectorized distance calculation
-            min_distances = np.full(len(rgb_pixels), np.inf)
-            
-            for color in colors:
-                distances = np.sum((rgb_pixels - color) ** 2, axis=1)
-                min_distances = np.minimum(min_distances, distances)
-            
-            colors.append(rgb_pixels[min_distances.argmax()])
+        if self.executor is not None and self.workers != workers:
+            self.shutdown(cancel=False)
         
-        bpy.data.images.remove(img)
-        return [tuple(c) for c in colors]
+        if self.executor is None:
+            try:
+                # Workers must share this process's resource tracker, or each
+                # would start its own and unlink the SharedArrays again on exit
+                resource_tracker.ensure_running()
+                executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("fork")
+                )
+                # A fork pool launches every process on its first submit
+                executor.submit(int)
+                self.executor = executor
+                self.workers = workers
+            except (OSError, ValueError) as e:
+                print(f"[UPP] Process pool unavailable, extracting in-process: {e}")
+                self.available = False
     
-    except Exception as e:
-        print(f"[UPP] Diverse extraction error: {e}")
-        return [(0.5, 0.5, 0.5)] * num_colors
+    def get(self):
+        """Return the running process executor, or None. Never forks."""
+        return self.executor if self.available else None
+    
+    def disable(self):
+        """Stop using worker processes after a pool failure."""
+        self.shutdown()
+        self.available = False
+    
+    def shutdown(self, cancel=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=cancel)
+            self.executor = None
+            self.workers = 0
+
+
+def best_of(futures, progress=None):
+    """Centers of the lowest-inertia (centers, inertia) future."""
+    best_centers, best_inertia = None, np.inf
+    try:
+        for done, future in enumerate(as_completed(futures), 1):
+            centers, inertia = future.result()
+            if best_centers is None or inertia < best_inertia:
+                best_centers, best_inertia = centers, inertia
+            if progress is not None:
+                progress(done / len(futures))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return best_centers
+
+
+def kmeans_restarts(points, k, weights, n_init, max_iters=10, progress=None, workers=1):
+    """Run ``n_init`` seeded K-means restarts in parallel and keep the best.
+
+    Restarts go to the process pool when prepare_extraction started one,
+    and to a thread pool of up to ``workers`` threads in this process
+    otherwise.
+    """
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    weights = np.ascontiguousarray(weights, dtype=np.float32)
+    seeds = np.random.randint(0, 2 ** 31 - 1, size=max(n_init, 1)).tolist()
+    
+    if len(seeds) == 1:
+        centers, _ = kmeans(points, k, weights, max_iters=max_iters,
+                            rng=np.random.RandomState(seeds[0]), progress=progress)
+        return centers
+    
+    workers = max(1, min(workers, len(seeds)))
+    pool = ExtractionPool()
+    executor = pool.get()
+    if executor is not None:
+        try:
+            with SharedArray(points) as shared_points, SharedArray(weights) as shared_weights:
+                futures = [
+                    executor.submit(kmeans_run_shared, shared_points.spec, shared_weights.spec,
+                                    k, max_iters, seed)
+                    for seed in seeds
+                ]
+                return best_of(futures, progress)
+        except (BrokenProcessPool, OSError) as e:
+            print(f"[UPP] Process pool failed, extracting in-process: {e}")
+            pool.disable()
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(kmeans_run, points, weights, k, max_iters, seed) for seed in seeds]
+        return best_of(futures, progress)
 
 
 # ============================================================================
 # PREVIEW IMAGE MANAGEMENT
 # ============================================================================
 
+def rasterize_grid(colors, grid_size, resolution):
+    """Rasterize palette colors into a (resolution, resolution, 4) float32 buffer.
+
+    Swatches are row-major from the top-left; Blender images start at the
+    bottom row, so the grid is flipped vertically. Missing swatches and the
+    remainder strip when resolution is not a multiple of grid_size stay
+    transparent black.
+    """
+    num_cells = grid_size * grid_size
+    cell_size = resolution // grid_size
+    
+    cells = np.zeros((num_cells, 4), dtype=np.float32)
+    count = min(len(colors), num_cells)
+    if count:
+        cells[:count, :3] = as_color_array(colors[:count])
+        cells[:count, 3] = 1.0
+    
+    cells = cells.reshape(grid_size, grid_size, 4)[::-1]
+    block = np.repeat(np.repeat(cells, cell_size, axis=0), cell_size, axis=1)
+    
+    pixels = np.zeros((resolution, resolution, 4), dtype=np.float32)
+    pixels[:block.shape[0], :block.shape[1]] = block
+    return pixels
+
+
 class PreviewManager:
     """Manages preview images for the addon (Singleton)."""
     
@@ -777,61 +2487,99 @@ class PreviewManager:
     def __init__(self):
         if not self.initialized:
             self.preview_images = {}
+            # name -> (grid_size, pixel buffer, colors last rastered)
+            self.grid_rasters = {}
             self.initialized = True
     
+    def _push_pixels(self, img, pixels):
+        """Upload a pixel buffer and refresh the UI thumbnail."""
+        img.pixels.foreach_set(pixels.ravel())
+        img.update()
+        if img.preview:
+            img.preview.reload()
+        else:
+            img.preview_ensure()
+    
     def create_grid_preview(self, colors, grid_size, name="palette_grid_preview"):
-        """Create a preview image of the color grid - optimized."""
+        """Create the color grid preview, reusing the image in place."""
         img_name = f"UPP_{name}"
-        
-        if img_name in bpy.data.images:
-            bpy.data.images.remove(bpy.data.images[img_name])
-        
         resolution = 256
-        img = bpy.data.images.new(img_name, resolution, resolution, alpha=False)
-        
-        # Pre-allocate and fill using numpy broadcasting
-        pixels = np.zeros((resolution, resolution, 4))
-        cell_size = resolution // grid_size
         
-        for i, color in enumerate(colors):
-            if i >= grid_size * grid_size:
-                break
-            
-            row = i // grid_size
-            col = i % grid_size
-            
-            x1, x2 = col * cell_size, (col + 1) * cell_size
-            y1 = (grid_size - 1 - row) * cell_size
-            y2 = y1 + cell_size
-            
-            pixels[y1:y2, x1:x2] = [color[0], color[1], color[2], 1.0]
+        img = bpy.data.images.get(img_name)
+        if img is not None and tuple(img.size) != (resolution, resolution):
+            bpy.data.images.remove(img)
+            img = None
+        if img is None:
+            img = bpy.data.images.new(img_name, resolution, resolution, alpha=False)
         
-        img.pixels[:] = pixels.ravel().tolist()
-        img.update()
-        img.preview_ensure()
+        pixels = rasterize_grid(colors, grid_size, resolution)
+        self._push_pixels(img, pixels)
         
+        self.grid_rasters[name] = (grid_size, pixels, as_color_array(colors).copy())
         self.preview_images[name] = img
         return img
     
+    def update_grid_preview(self, colors, grid_size, name="palette_grid_preview"):
+        """Repaint only the swatches that changed since the last raster.
+
+        Falls back to a full ``create_grid_preview`` when there is no
+        persistent buffer yet or the grid layout changed.
+        """
+        img = bpy.data.images.get(f"UPP_{name}")
+        raster = self.grid_rasters.get(name)
+        colors = as_color_array(colors)
+        
+        if (img is None or raster is None or raster[0] != grid_size
+                or len(raster[2]) != len(colors)
+                or tuple(img.size) != raster[1].shape[:2]):
+            return self.create_grid_preview(colors, grid_size, name)
+        
+        _, pixels, rastered = raster
+        num_cells = grid_size * grid_size
+        dirty = np.flatnonzero(np.any(rastered != colors, axis=1))
+        dirty = dirty[dirty < num_cells]
+        if len(dirty) == 0:
+            return img
+        
+        if len(dirty) > num_cells // 8:
+            # Repainting cell by cell only pays off for a few swatches
+            pixels[:] = rasterize_grid(colors, grid_size, pixels.shape[0])
+        else:
+            cell_size = pixels.shape[0] // grid_size
+            for i in dirty.tolist():
+                row, col = divmod(i, grid_size)
+                y1 = (grid_size - 1 - row) * cell_size
+                x1 = col * cell_size
+                pixels[y1:y1 + cell_size, x1:x1 + cell_size, :3] = colors[i]
+        rastered[dirty] = colors[dirty]
+        
+        self._push_pixels(img, pixels)
+        return img
+    
     def load_source_preview(self, filepath, name="palette_source_preview"):
-        """Load source image for preview - optimized."""
+        """Load a downsampled copy of the source image for preview."""
         img_name = f"UPP_{name}"
         
         if img_name in bpy.data.images:
             bpy.data.images.remove(bpy.data.images[img_name])
         
         try:
-            img = bpy.data.images.load(filepath)
-            img.name = img_name
-            
-            # Scale down large images
-            max_size = 256
-            if img.size[0] > max_size or img.size[1] > max_size:
-                scale = max_size / max(img.size[0], img.size[1])
-                new_w = int(img.size[0] * scale)
-                new_h = int(img.size[1] * scale)
-                img.scale(new_w, new_h)
+            source = bpy.data.images.load(filepath)
+            try:
+                # Stride large images down to at most max_size on either side
+                max_size = 256
+                step = max(1, math.ceil(max(source.size) / max_size))
+                pixels = read_image_pixels(source)[::step, ::step]
+                is_float = source.is_float
+                colorspace = source.colorspace_settings.name
+            finally:
+                bpy.data.images.remove(source)
             
+            height, width = pixels.shape[:2]
+            img = bpy.data.images.new(img_name, width, height, alpha=True, float_buffer=is_float)
+            img.colorspace_settings.name = colorspace
+            img.pixels.foreach_set(np.ascontiguousarray(pixels).ravel())
+            img.update()
             img.preview_ensure()
             
             self.preview_images[name] = img
@@ -853,20 +2601,853 @@ class PreviewManager:
             except:
                 pass
         self.preview_images.clear()
+        self.grid_rasters.clear()
+
+
+# ============================================================================
+# STREAMING IMAGE EXPORT
+# ============================================================================
+# Exported palettes are a grid_size x grid_size image upscaled with nearest
+# neighbour, so every output scanline is a copy of one of grid_size distinct
+# rows. Each writer encodes those rows once and streams them to disk, keeping
+# peak memory to a handful of scanlines whatever the output resolution.
+
+BLENDER_FILE_FORMATS = {
+    'PNG': 'PNG', 'JPEG': 'JPEG', 'EXR': 'OPEN_EXR',
+    'TIFF': 'TIFF', 'BMP': 'BMP', 'TGA': 'TARGA'
+}
+
+
+def nearest_cell_index(grid_size, length):
+    """Map each of ``length`` output pixels to its grid cell (nearest neighbour)."""
+    return (np.arange(length) * grid_size) // length
+
+
+def grid_cells(colors, grid_size):
+    """Return palette colors as a (grid_size, grid_size, 3) float32 array.
+
+    Missing swatches are padded with mid gray.
+    """
+    cells = np.full((grid_size * grid_size, 3), 0.5, dtype=np.float32)
+    colors = as_color_array(colors)[:len(cells)]
+    cells[:len(colors)] = colors
+    return cells.reshape(grid_size, grid_size, 3)
+
+
+def _to_uint8(values):
+    """Quantize 0-1 floats to bytes the way Blender's byte buffers do."""
+    return (np.clip(values, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def _grid_rows(cells, width, encode):
+    """Encode every distinct grid row at ``width`` pixels."""
+    cols = nearest_cell_index(cells.shape[0], width)
+    return [encode(row[cols]) for row in cells]
+
+
+def _scanlines(cells, height, progress=None, bottom_up=False):
+    """Yield (y, grid row) for each output scanline, reporting progress."""
+    order = nearest_cell_index(cells.shape[0], height).tolist()
+    if bottom_up:
+        order.reverse()
+    for y, r in enumerate(order):
+        if progress is not None and y % 256 == 0:
+            progress(y / height)
+        yield y, r
+
+
+def _write_png(f, cells, width, height, progress=None):
+    """Stream an 8-bit RGB PNG."""
+    def chunk(tag, data):
+        f.write(struct.pack(">I", len(data)) + tag + data)
+        f.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+    
+    rows = _grid_rows(cells, width, lambda row: b"\x00" + _to_uint8(row).tobytes())
+    
+    f.write(b"\x89PNG\r\n\x1a\n")
+    chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    
+    compressor = zlib.compressobj(6)
+    for _, r in _scanlines(cells, height, progress):
+        data = compressor.compress(rows[r])
+        if data:
+            chunk(b"IDAT", data)
+    chunk(b"IDAT", compressor.flush())
+    chunk(b"IEND", b"")
+
+
+def _write_tiff(f, cells, width, height, progress=None):
+    """Stream an uncompressed baseline RGB TIFF (single strip)."""
+    rows = _grid_rows(cells, width, lambda row: _to_uint8(row).tobytes())
+    strip_size = width * height * 3
+    
+    # Header, then pixel data, then the IFD and its out-of-line values
+    f.write(b"II*\x00" + struct.pack("<I", 8 + strip_size))
+    for _, r in _scanlines(cells, height, progress):
+        f.write(rows[r])
+    
+    ifd_offset = 8 + strip_size
+    num_tags = 12
+    extra_offset = ifd_offset + 2 + num_tags * 12 + 4
+    bits_offset = extra_offset
+    res_offset = extra_offset + 6
+    
+    tags = [
+        (256, 4, 1, width),             # ImageWidth
+        (257, 4, 1, height),            # ImageLength
+        (258, 3, 3, bits_offset),       # BitsPerSample
+        (259, 3, 1, 1),                 # Compression: none
+        (262, 3, 1, 2),                 # PhotometricInterpretation: RGB
+        (273, 4, 1, 8),                 # StripOffsets
+        (277, 3, 1, 3),                 # SamplesPerPixel
+        (278, 4, 1, height),            # RowsPerStrip
+        (279, 4, 1, strip_size),        # StripByteCounts
+        (282, 5, 1, res_offset),        # XResolution
+        (283, 5, 1, res_offset + 8),    # YResolution
+        (296, 3, 1, 2),                 # ResolutionUnit: inch
+    ]
+    f.write(struct.pack("<H", num_tags))
+    for tag, type_, count, value in tags:
+        if type_ == 3 and count == 1:
+            f.write(struct.pack("<HHIHH", tag, type_, count, value, 0))
+        else:
+            f.write(struct.pack("<HHII", tag, type_, count, value))
+    f.write(struct.pack("<I", 0))
+    f.write(struct.pack("<HHH", 8, 8, 8))
+    f.write(struct.pack("<IIII", 72, 1, 72, 1))
+
+
+def _write_bmp(f, cells, width, height, progress=None):
+    """Stream a 24-bit bottom-up BMP."""
+    padding = b"\x00" * (-width * 3 % 4)
+    rows = _grid_rows(cells, width, lambda row: _to_uint8(row[:, ::-1]).tobytes() + padding)
+    image_size = len(rows[0]) * height
+    
+    f.write(b"BM" + struct.pack("<IHHI", 54 + image_size, 0, 0, 54))
+    f.write(struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, image_size, 2835, 2835, 0, 0))
+    for _, r in _scanlines(cells, height, progress, bottom_up=True):
+        f.write(rows[r])
+
+
+def _write_tga(f, cells, width, height, progress=None):
+    """Stream an uncompressed 24-bit top-left origin TGA."""
+    rows = _grid_rows(cells, width, lambda row: _to_uint8(row[:, ::-1]).tobytes())
+    
+    f.write(struct.pack("<BBBHHBHHHHBB", 0, 0, 2, 0, 0, 0, 0, 0, width, height, 24, 0x20))
+    for _, r in _scanlines(cells, height, progress):
+        f.write(rows[r])
+
+
+def _write_exr(f, cells, width, height, progress=None):
+    """Stream an uncompressed half-float RGB scanline OpenEXR.
+
+    EXR holds scene-linear values, so the sRGB-encoded palette colors are
+    decoded first, as Blender does when saving a byte image as EXR.
+    """
+    def attribute(name, type_name, value):
+        return name.encode() + b"\x00" + type_name.encode() + b"\x00" + struct.pack("<i", len(value)) + value
+    
+    # Channels are stored in alphabetical order: B, G, R
+    channels = b"".join(
+        name + b"\x00" + struct.pack("<iBBBBii", 1, 0, 0, 0, 0, 1, 1)
+        for name in (b"B", b"G", b"R")
+    ) + b"\x00"
+    window = struct.pack("<iiii", 0, 0, width - 1, height - 1)
+    
+    header = (
+        struct.pack("<ii", 20000630, 2)
+        + attribute("channels", "chlist", channels)
+        + attribute("compression", "compression", b"\x00")
+        + attribute("dataWindow", "box2i", window)
+        + attribute("displayWindow", "box2i", window)
+        + attribute("lineOrder", "lineOrder", b"\x00")
+        + attribute("pixelAspectRatio", "float", struct.pack("<f", 1.0))
+        + attribute("screenWindowCenter", "v2f", struct.pack("<ff", 0.0, 0.0))
+        + attribute("screenWindowWidth", "float", struct.pack("<f", 1.0))
+        + b"\x00"
+    )
+    
+    rows = _grid_rows(
+        cells, width,
+        lambda row: np.ascontiguousarray(srgb_to_linear(row)[:, ::-1].T).astype("<f2").tobytes()
+    )
+    block_size = 8 + len(rows[0])
+    first_block = len(header) + 8 * height
+    
+    offsets = first_block + block_size * np.arange(height, dtype=np.uint64)
+    
+    f.write(header)
+    f.write(offsets.astype("<u8").tobytes())
+    for y, r in _scanlines(cells, height, progress):
+        f.write(struct.pack("<ii", y, len(rows[r])))
+        f.write(rows[r])
+
+
+GRID_IMAGE_WRITERS = {
+    'PNG': _write_png,
+    'TIFF': _write_tiff,
+    'BMP': _write_bmp,
+    'TGA': _write_tga,
+    'EXR': _write_exr,
+}
+
+
+def stream_grid_image(filepath, cells, resolution, file_format, progress=None):
+    """Stream grid cells to disk as a ``resolution`` square image.
+
+    Never touches bpy, so it is safe to run on a worker thread. Formats
+    without a streaming writer are written as PNG. A partially written
+    file is removed if the write fails or is cancelled.
+    """
+    writer = GRID_IMAGE_WRITERS.get(file_format, _write_png)
+    try:
+        with open(filepath, 'wb') as f:
+            writer(f, cells, resolution, resolution, progress)
+    except BaseException:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        raise
+
+
+def transcode_image(source_path, filepath, file_format):
+    """Re-save an image file in another format through Blender."""
+    img = bpy.data.images.load(source_path)
+    try:
+        img.filepath_raw = filepath
+        img.file_format = BLENDER_FILE_FORMATS.get(file_format, 'PNG')
+        img.save()
+    finally:
+        bpy.data.images.remove(img)
+
+
+def make_temp_png():
+    """Create an empty temporary .png file and return its path."""
+    fd, temp_path = tempfile.mkstemp(suffix=".png")
+    os.close(fd)
+    return temp_path
+
+
+def export_grid_image(filepath, colors, grid_size, resolution, file_format, progress=None):
+    """Write the palette grid as a ``resolution`` square image.
+
+    PNG, TIFF, BMP, TGA and EXR are streamed scanline by scanline. Formats
+    without a streaming encoder are written to a temporary PNG first and
+    transcoded by Blender, so no full-resolution float buffer is ever built.
+    """
+    cells = grid_cells(colors, grid_size)
+    
+    if file_format in GRID_IMAGE_WRITERS:
+        stream_grid_image(filepath, cells, resolution, file_format, progress)
+        return
+    
+    temp_path = make_temp_png()
+    try:
+        stream_grid_image(temp_path, cells, resolution, 'PNG', progress)
+        transcode_image(temp_path, filepath, file_format)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+# ============================================================================
+# PRESET THUMBNAILS
+# ============================================================================
+# The preset browser shows each preset as a thumbnail in a bpy.utils.previews
+# collection. Thumbnails are small PNGs written by the streaming exporter into
+# a disk cache and named by a hash of the preset's colors, so each preset is
+# rendered once per install; Blender then loads them lazily. A category's
+# thumbnails are only touched the first time that category is browsed, and
+# browsing all categories loads the missing ones from a timer, one category
+# per tick, instead of inside the enum callback.
+
+# Side of a preset thumbnail in pixels
+PRESET_THUMBNAIL_SIZE = 128
+
+
+def preset_key(colors):
+    """Content hash of a preset's colors, naming its cached thumbnail."""
+    return hashlib.blake2b(as_color_array(colors).tobytes(), digest_size=8).hexdigest()
+
+
+def preset_colors(category, name, num_colors):
+    """A preset's colors expanded to ``num_colors``, or None if it does not exist."""
+    presets = PRESET_PALETTES.get(category, {})
+    if name not in presets:
+        return None
+    return expand_colors_to_grid(list(presets[name]), num_colors)
+
+
+def render_preset_thumbnail(filepath, colors):
+    """Write a preset as a square PNG of its colors, row-major."""
+    side = max(1, math.ceil(math.sqrt(len(colors))))
+    stream_grid_image(filepath, grid_cells(colors, side), PRESET_THUMBNAIL_SIZE, 'PNG')
+
+
+class PresetThumbnails:
+    """Preset thumbnails and preset browser enum items (Singleton)."""
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if not self.initialized:
+            self.previews = None
+            # category -> enum items, kept alive for Blender
+            self.items = {}
+            # 'ALL' items while categories are still loading
+            self.partial = []
+            self.initialized = True
+    
+    @staticmethod
+    def cache_dir():
+        """Directory of the cached thumbnail PNGs."""
+        try:
+            return bpy.utils.user_resource(
+                'DATAFILES', path=os.path.join("ultimate_palette_pro", "preset_thumbnails"), create=True
+            )
+        except Exception:
+            path = os.path.join(tempfile.gettempdir(), "ultimate_palette_pro_thumbnails")
+            os.makedirs(path, exist_ok=True)
+            return path
+    
+    def icon_id(self, colors):
+        """Preview icon of a preset, rendering its thumbnail if it is not cached."""
+        if self.previews is None:
+            self.previews = bpy.utils.previews.new()
+        
+        key = preset_key(colors)
+        if key not in self.previews:
+            filepath = os.path.join(self.cache_dir(), f"{key}.png")
+            if not os.path.exists(filepath):
+                render_preset_thumbnail(filepath, colors)
+            self.previews.load(key, filepath, 'IMAGE')
+        return self.previews[key].icon_id
+    
+    def category_items(self, category):
+        """Enum items of one category, built on first use."""
+        items = self.items.get(category)
+        if items is None:
+            items = []
+            for number, (name, colors) in enumerate(PRESET_PALETTES[category].items()):
+                try:
+                    icon = self.icon_id(colors)
+                except Exception as e:
+                    print(f"[UPP] Preset thumbnail failed for {name}: {e}")
+                    icon = 0
+                identifier = f"{category}|{name}"
+                items.append((identifier, name, f"{category}: {name}", icon,
+                              PRESET_ENUM_BASE[category] + number))
+            self.items[category] = items
+        return items
+    
+    def enum_items(self, category):
+        """Enum items for a category filter, 'ALL' listing every category."""
+        if category != 'ALL':
+            return self.category_items(category) if category in PRESET_PALETTES else []
+        
+        items = self.items.get('ALL')
+        if items is not None:
+            return items
+        
+        if all(name in self.items for name in PRESET_PALETTES):
+            items = self.items['ALL'] = [
+                item for name in PRESET_PALETTES for item in self.items[name]
+            ]
+            return items
+        
+        if not bpy.app.timers.is_registered(load_preset_thumbnails):
+            bpy.app.timers.register(load_preset_thumbnails, first_interval=0.0)
+        self.partial = [
+            item for name in PRESET_PALETTES
+            for item in (self.items.get(name) or self.placeholder_items(name))
+        ]
+        return self.partial
+    
+    @staticmethod
+    def placeholder_items(category):
+        """Enum items of a category whose thumbnails are not loaded yet."""
+        return [
+            (f"{category}|{name}", name, f"{category}: {name}", 'COLOR', PRESET_ENUM_BASE[category] + number)
+            for number, name in enumerate(PRESET_PALETTES[category])
+        ]
+    
+    def load_next(self):
+        """Load the thumbnails of one category not browsed yet; False when none are left."""
+        for name in PRESET_PALETTES:
+            if name not in self.items:
+                self.category_items(name)
+                return True
+        return False
+    
+    def clear(self):
+        """Release the previews collection; cached PNGs stay on disk."""
+        if bpy.app.timers.is_registered(load_preset_thumbnails):
+            bpy.app.timers.unregister(load_preset_thumbnails)
+        if self.previews is not None:
+            bpy.utils.previews.remove(self.previews)
+            self.previews = None
+        self.items.clear()
+        self.partial = []
+
+
+def load_preset_thumbnails():
+    """Timer callback loading the preset thumbnails one category per tick."""
+    loaded = PresetThumbnails().load_next()
+    redraw_view3d()
+    return 0.0 if loaded else None
+
+
+# Stable enum value of each category's first preset, so a selection keeps its
+# value whichever category filter is active
+PRESET_ENUM_BASE = dict(zip(
+    PRESET_PALETTES,
+    itertools.accumulate((len(presets) for presets in PRESET_PALETTES.values()), initial=0),
+))
+
+
+def preset_browser_items(self, context):
+    """Enum items callback of the preset browser."""
+    return PresetThumbnails().enum_items(self.preset_category)
+
+
+# ============================================================================
+# PALETTE I/O
+# ============================================================================
+# Bulk access to UPP_PaletteColorItem collections. foreach_get/foreach_set
+# move the whole palette through one contiguous buffer instead of paying the
+# RNA lookup per item, and they never fire the per-item update callbacks.
+
+def read_palette_colors(collection):
+    """Return all colors of a palette collection as an (N, 3) float32 array."""
+    buf = np.empty(len(collection) * 3, dtype=np.float32)
+    collection.foreach_get("color", buf)
+    return buf.reshape(-1, 3)
+
+
+def read_palette_locks(collection):
+    """Return the lock flags of a palette collection as a bool array."""
+    buf = np.empty(len(collection), dtype=bool)
+    collection.foreach_get("locked", buf)
+    return buf
+
+
+def reorder_locks(locks, order):
+    """Lock flags following their colors through a reorder.
+
+    ``order`` gives the source index of each new slot; negative entries
+    are filler cells and come out unlocked.
+    """
+    order = np.asarray(order, dtype=np.intp)
+    return (order >= 0) & np.asarray(locks, dtype=bool)[np.maximum(order, 0)]
+
+
+def read_palette_names(collection):
+    """Return the swatch names of a palette collection.
+
+    String properties are not supported by foreach_get, so this is the one
+    per-item read in the I/O layer.
+    """
+    return [item.name for item in collection]
+
+
+def resize_palette(collection, count):
+    """Grow or shrink a palette collection to exactly ``count`` items."""
+    while len(collection) > count:
+        collection.remove(len(collection) - 1)
+    for _ in range(count - len(collection)):
+        collection.add()
+
+
+def write_palette_names(collection, names):
+    """Assign swatch names in order."""
+    for item, name in zip(collection, names):
+        item.name = name
+
+
+def write_palette_colors(collection, colors, names=None, locks=None):
+    """Replace the contents of a palette collection in bulk.
+
+    The collection is resized to match ``colors``; surviving items keep
+    their lock flags unless ``locks`` is given. Callers that move colors
+    to other slots must pass ``locks`` (see reorder_locks), or the flags
+    would stay behind on the old slots.
+    """
+    buf = np.ascontiguousarray(colors, dtype=np.float32).reshape(-1, 3)
+    
+    resize_palette(collection, len(buf))
+    collection.foreach_set("color", buf.ravel())
+    
+    if locks is not None:
+        collection.foreach_set("locked", np.ascontiguousarray(locks, dtype=bool))
+    if names is not None:
+        write_palette_names(collection, names)
+
+
+# ============================================================================
+# PALETTE BATCH EDITING
+# ============================================================================
+
+class PaletteBatch:
+    """Defer preview and name updates while the palette is edited in bulk.
+
+    Every ``item.color`` write normally fires ``update_preview``, which
+    rebuilds the whole preview image. Inside a batch those callbacks are
+    suppressed; leaving the outermost batch renames the swatches and
+    rebuilds the preview exactly once. Only the outermost batch decides
+    whether swatches are renamed, so callbacks that open their own batch
+    cannot overwrite names the caller is writing.
+
+        with PaletteBatch(context):
+            write_palette_colors(props.colors, colors)
+    """
+
+    _depth = 0
+    _rename = False
+
+    def __init__(self, context, rename=True):
+        self.context = context
+        self.rename = rename
+
+    @classmethod
+    def active(cls):
+        """Return True while any batch is open."""
+        return cls._depth > 0
+
+    def __enter__(self):
+        if PaletteBatch._depth == 0:
+            PaletteBatch._rename = self.rename
+        PaletteBatch._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        PaletteBatch._depth -= 1
+        if PaletteBatch._depth == 0:
+            rename = PaletteBatch._rename
+            PaletteBatch._rename = False
+            self.commit(rename)
+        return False
+
+    def commit(self, rename):
+        """Apply the deferred name and preview updates."""
+        props = self.context.scene.ultimate_palette
+        colors = read_palette_colors(props.colors)
+        
+        if rename:
+            write_palette_names(props.colors, get_color_names(colors, props.color_metric))
+        
+        if len(colors) > 0:
+            pm = PreviewManager()
+            pm.create_grid_preview(colors, int(props.grid_size))
+
+
+# ============================================================================
+# GRID TRANSFORMS
+# ============================================================================
+# Flips and rotations are applied to a grid of cell indices, so any chain of
+# them composes into one permutation that moves the palette in a single
+# bulk write.
+
+GRID_TRANSFORMS = {
+    'FLIP_H': lambda grid: grid[:, ::-1],
+    'FLIP_V': lambda grid: grid[::-1],
+    'ROTATE_CCW': lambda grid: np.rot90(grid, 1),
+    'ROTATE_CW': lambda grid: np.rot90(grid, -1),
+    'ROTATE_180': lambda grid: np.rot90(grid, 2),
+    'TRANSPOSE': lambda grid: grid.T,
+}
+
+
+def grid_permutation(rows, cols, steps):
+    """Compose transform ``steps`` on a rows x cols grid into one permutation.
+
+    Returns (permutation, shape): cell i of the result, in row-major
+    order, takes source cell ``permutation[i]``. Rotating or transposing a
+    non-square grid swaps its shape.
+    """
+    grid = np.arange(rows * cols).reshape(rows, cols)
+    for step in steps:
+        grid = GRID_TRANSFORMS[step](grid)
+    return grid.ravel(), grid.shape
+
+
+def transform_order(count, rows, cols, steps):
+    """Apply transform ``steps`` to ``count`` entries laid out row-major on a grid.
+
+    Returns (order, shape): entry i of the result takes source entry
+    ``order[i]``, or an empty cell where that is -1. Entries past the grid
+    stay where they are.
+    """
+    cells = rows * cols
+    permutation, shape = grid_permutation(rows, cols, steps)
+    
+    order = np.arange(max(cells, count))
+    order[:cells] = permutation
+    order[order >= count] = -1
+    return order[:count], shape
+
+
+def transform_grid(colors, rows, cols, steps, fill=(0.5, 0.5, 0.5)):
+    """Apply transform ``steps`` to colors laid out row-major on a grid.
+
+    Cells the palette does not reach are treated as ``fill``; colors past
+    the grid stay where they are. Returns (colors, shape) with as many
+    colors as were given.
+    """
+    colors = np.asarray(colors, dtype=np.float32)
+    order, shape = transform_order(len(colors), rows, cols, steps)
+    
+    result = colors[np.maximum(order, 0)]
+    result[order < 0] = fill
+    return result, shape
+
+
+def apply_grid_transform(context, steps):
+    """Transform the scene palette on its grid in one batched write."""
+    props = context.scene.ultimate_palette
+    grid_size = int(props.grid_size)
+    
+    colors, _ = transform_grid(read_palette_colors(props.colors), grid_size, grid_size, steps)
+    order, _ = transform_order(len(colors), grid_size, grid_size, steps)
+    with PaletteBatch(context):
+        write_palette_colors(props.colors, colors,
+                             locks=reorder_locks(read_palette_locks(props.colors), order))
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+#
+# Long operations run as jobs so the UI never freezes. NumPy work runs on a
+# worker thread (NumPy releases the GIL inside its kernels). bpy is not
+# thread-safe, so anything that touches Blender data runs on the main thread:
+# either in a job's ``on_done`` callback or as a stepped job, a generator
+# advanced a few milliseconds at a time. One timer polls every job, applies
+# finished results and redraws the panels.
+
+# Seconds between scheduler polls while only worker threads are running
+JOB_POLL_INTERVAL = 0.1
+# Seconds a stepped job may hold the main thread per poll
+JOB_TIME_SLICE = 0.02
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's work once the job has been cancelled."""
+
+
+class Job:
+    """A unit of background work run by the JobScheduler.
+
+    Threaded jobs call ``work(job)`` on a worker thread and use its return
+    value as the result; long loops should call ``job.report(fraction)``,
+    which also raises JobCancelled once the job is cancelled. Stepped jobs
+    (``threaded=False``) pass a generator function that runs on the main
+    thread, yields progress fractions and returns the result.
+    ``on_done(result)`` is always called on the main thread.
+    """
+    
+    def __init__(self, label, work, on_done=None, threaded=True):
+        self.label = label
+        self.work = work
+        self.on_done = on_done
+        self.threaded = threaded
+        self.progress = 0.0
+        self.cancelled = False
+        self.finished = False
+        self.closed = False
+        self.result = None
+        self.error = None
+        self.thread = None
+        self.steps = None
+    
+    def report(self, fraction):
+        """Record progress; raise JobCancelled if the job was cancelled."""
+        if self.cancelled:
+            raise JobCancelled()
+        self.progress = clamp(fraction)
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def start(self):
+        if self.threaded:
+            self.thread = threading.Thread(target=self.run, name=f"UPP: {self.label}", daemon=True)
+            self.thread.start()
+        else:
+            self.steps = self.work(self)
+    
+    def run(self):
+        """Worker thread body."""
+        try:
+            self.result = self.work(self)
+        except JobCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        self.finished = True
+    
+    def step(self, time_slice):
+        """Advance a stepped job for up to ``time_slice`` seconds."""
+        deadline = time.perf_counter() + time_slice
+        try:
+            while not self.cancelled:
+                self.progress = clamp(next(self.steps))
+                if time.perf_counter() >= deadline:
+                    return
+            self.steps.close()
+        except StopIteration as stop:
+            self.result = stop.value
+        except JobCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        self.finished = True
+
+
+class JobScheduler:
+    """Runs background jobs and delivers their results (Singleton)."""
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if not self.initialized:
+            self.jobs = []
+            self.last_message = ""
+            self.initialized = True
+    
+    def submit(self, job):
+        """Start a job and make sure the poll timer is running."""
+        job.start()
+        self.jobs.append(job)
+        if not bpy.app.timers.is_registered(poll_jobs):
+            bpy.app.timers.register(poll_jobs, first_interval=0.0)
+        return job
+    
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+    
+    def poll(self):
+        """Advance stepped jobs and close finished ones.
+
+        Returns the delay until the next poll, or None when idle.
+        """
+        stepped = [job for job in self.jobs if not job.threaded and not job.finished]
+        for job in stepped:
+            job.step(JOB_TIME_SLICE / len(stepped))
+        
+        for job in [job for job in self.jobs if job.finished]:
+            self.jobs.remove(job)
+            self.close(job)
+        
+        if not self.jobs:
+            return None
+        return 0.0 if stepped else JOB_POLL_INTERVAL
+    
+    def close(self, job):
+        """Deliver a finished job's result on the main thread."""
+        if job.error is None and not job.cancelled and job.on_done is not None:
+            try:
+                job.on_done(job.result)
+            except Exception as e:
+                job.error = e
+        
+        if job.error is not None:
+            self.last_message = f"{job.label} failed: {job.error}"
+            print(f"[UPP] {self.last_message}")
+        elif job.cancelled:
+            self.last_message = f"{job.label} cancelled"
+        else:
+            self.last_message = f"{job.label} done"
+        job.closed = True
+    
+    def shutdown(self):
+        """Cancel every job and wait briefly for worker threads to exit."""
+        self.cancel_all()
+        for job in self.jobs:
+            if job.thread is not None:
+                job.thread.join(timeout=1.0)
+            elif job.steps is not None:
+                job.steps.close()
+        self.jobs.clear()
+
+
+def redraw_view3d(context=None):
+    """Tag every 3D viewport (and so the sidebar panels) for redraw."""
+    context = context or bpy.context
+    window_manager = getattr(context, "window_manager", None)
+    if window_manager is None:
+        return
+    
+    for window in window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+
+def poll_jobs():
+    """Timer callback driving the JobScheduler."""
+    interval = JobScheduler().poll()
+    redraw_view3d()
+    return interval
+
+
+def prepare_histogram(image_path, alpha_threshold=0.1):
+    """Main-thread half of a background histogram load.
+
+    Returns (cache key, histogram, pixels): the cached histogram when there
+    is one, otherwise the decoded (N, 4) pixels, which a worker thread can
+    bin with ``build_color_histogram``. Decoding stays here because it
+    goes through bpy.
+    """
+    cache = ImageColorCache()
+    key = cache.make_key(image_path, HISTOGRAM_BITS, alpha_threshold)
+    histogram = cache.lookup(key)
+    pixels = None if histogram is not None else decode_image_pixels(key[0])
+    return key, histogram, pixels
 
 
 # ============================================================================
 # UPDATE CALLBACKS
 # ============================================================================
 
-def update_preview(self, context):
-    """Update the grid preview when colors change."""
-    props = context.scene.ultimate_palette
+# Seconds to wait for more swatch edits before repainting the preview
+PREVIEW_DEBOUNCE_INTERVAL = 0.05
+
+
+def flush_preview():
+    """Timer callback: repaint the swatches edited since the last raster."""
+    context = bpy.context
+    scene = getattr(context, "scene", None)
+    if scene is None:
+        return None
+    
+    props = scene.ultimate_palette
     if len(props.colors) > 0:
-        colors = [tuple(c.color) for c in props.colors]
-        grid_size = int(props.grid_size)
+        colors = read_palette_colors(props.colors)
         pm = PreviewManager()
-        pm.create_grid_preview(colors, grid_size)
+        pm.update_grid_preview(colors, int(props.grid_size))
+        redraw_view3d(context)
+    return None
+
+
+def update_preview(self, context):
+    """Schedule a debounced preview repaint when a swatch changes."""
+    if PaletteBatch.active():
+        return
+    
+    if not bpy.app.timers.is_registered(flush_preview):
+        bpy.app.timers.register(flush_preview, first_interval=PREVIEW_DEBOUNCE_INTERVAL)
 
 
 def update_grid_size(self, context):
@@ -878,21 +3459,28 @@ def update_grid_size(self, context):
     if len(props.colors) == 0:
         return
     
-    existing = [tuple(c.color) for c in props.colors]
+    existing = read_palette_colors(props.colors).tolist()
     
     if len(existing) < num_colors:
         new_colors = expand_colors_to_grid(existing, num_colors)
     else:
         new_colors = existing[:num_colors]
     
-    props.colors.clear()
-    for color in new_colors:
-        item = props.colors.add()
-        item.color = color[:3]
-        item.name = get_color_name(*color[:3])
+    with PaletteBatch(context):
+        write_palette_colors(props.colors, new_colors)
+
+
+def update_preset_browser(self, context):
+    """Load the preset picked in the thumbnail browser."""
+    category, _, name = self.preset_browser.partition('|')
+    colors = preset_colors(category, name, int(self.grid_size) ** 2)
+    if colors is None:
+        return
     
-    pm = PreviewManager()
-    pm.create_grid_preview(new_colors, grid_size)
+    self.selected_preset_category = category
+    self.selected_preset_name = name
+    with PaletteBatch(context):
+        write_palette_colors(self.colors, colors, locks=np.zeros(len(colors), dtype=bool))
 
 
 def update_source_image(self, context):
@@ -906,6 +3494,61 @@ def update_source_image(self, context):
     if os.path.exists(filepath):
         pm = PreviewManager()
         pm.load_source_preview(filepath)
+        
+        # Bin the image in the background so extraction hits the cache
+        try:
+            key, histogram, pixels = prepare_histogram(filepath)
+        except Exception as e:
+            print(f"[UPP] Failed to cache image histogram: {e}")
+            return
+        
+        if histogram is None:
+            def work(job):
+                return build_color_histogram(pixels, key[3], key[4], job.report)
+            
+            JobScheduler().submit(Job(
+                f"Reading {os.path.basename(filepath)}", work,
+                on_done=lambda histogram: ImageColorCache().store(key, histogram),
+            ))
+
+
+# ============================================================================
+# ADDON PREFERENCES
+# ============================================================================
+
+def update_pixel_cache_budget(self, context):
+    """Evict cached images that no longer fit the new budget."""
+    ImageColorCache().trim()
+
+
+class UPP_AddonPreferences(AddonPreferences):
+    """Addon-wide settings."""
+    bl_idname = __name__
+    
+    pixel_cache_mb: IntProperty(
+        name="Image Cache (MB)",
+        min=0, max=8192, default=DEFAULT_PIXEL_CACHE_MB,
+        update=update_pixel_cache_budget,
+        description="Memory kept for decoded source image histograms between extractions"
+    )
+    
+    extraction_workers: IntProperty(
+        name="Extraction Workers",
+        min=0, max=256, default=0,
+        description="Worker processes used for K-means restarts (0 = one per CPU core)"
+    )
+    
+    kmeans_restarts: IntProperty(
+        name="K-means Restarts",
+        min=1, max=64, default=DEFAULT_KMEANS_RESTARTS,
+        description="Independently seeded K-means runs per extraction; the tightest clustering is kept"
+    )
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "pixel_cache_mb")
+        layout.prop(self, "extraction_workers")
+        layout.prop(self, "kmeans_restarts")
 
 
 # ============================================================================
@@ -989,10 +3632,17 @@ class UPP_Properties(PropertyGroup):
             ('Art Styles', 'Art Styles', 'Art style themes'),
             ('Cinematic', 'Cinematic', 'Cinematic themes'),
         ],
-        default='ALL',
+        default='Nature',
         description="Filter presets by category"
     )
     
+    preset_browser: EnumProperty(
+        name="Preset",
+        items=preset_browser_items,
+        update=update_preset_browser,
+        description="Pick a preset palette"
+    )
+    
     selected_preset_category: StringProperty(name="Selected Category", default="")
     selected_preset_name: StringProperty(name="Selected Preset", default="")
     
@@ -1008,10 +3658,17 @@ class UPP_Properties(PropertyGroup):
     extraction_algorithm: EnumProperty(
         name="Algorithm",
         items=EXTRACTION_ALGORITHMS,
-        default='KMEANS',
+        default='WU',
         description="Color extraction algorithm"
     )
     
+    color_metric: EnumProperty(
+        name="Color Distance",
+        items=COLOR_METRICS,
+        default='OKLAB',
+        description="How color difference is measured by extraction, gradient sorting and naming"
+    )
+    
     # Arrangement
     arrangement_type: EnumProperty(
         name="Arrangement",
@@ -1108,11 +3765,8 @@ class UPP_Properties(PropertyGroup):
 # WEBSOCKET SERVER (Embedded for easy deployment)
 # ============================================================================
 
-import threading
 import json
 import socket
-import struct
-import hashlib
 import base64
 
 class SimpleWebSocketServer:
@@ -1242,16 +3896,31 @@ class SimpleWebSocketServer:
             elif payload_len == 127:
                 payload_len = struct.unpack('>Q', client_socket.recv(8))[0]
 
-            mask = client_socket.recv(4) if masked else None
-            payload = client_socket.recv(payload_len)
+            mask = self._recv_exact(client_socket, 4) if masked else None
+            payload = self._recv_exact(client_socket, payload_len)
 
             if masked and mask:
-                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+                # XOR with the 4-byte mask repeated over the payload
+                data = np.frombuffer(payload, dtype=np.uint8)
+                key = np.resize(np.frombuffer(mask, dtype=np.uint8), len(data))
+                payload = (data ^ key).tobytes()
 
             return payload.decode('utf-8')
         except:
             return None
 
+    def _recv_exact(self, client_socket, size):
+        """Receive exactly ``size`` bytes; large frames arrive in pieces."""
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = client_socket.recv(min(remaining, 65536))
+            if not chunk:
+                raise ConnectionError("Connection closed mid-frame")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b''.join(chunks)
+
     def send(self, client_socket, message):
         """Send a message to a specific client."""
         try:
@@ -1269,7 +3938,7 @@ class SimpleWebSocketServer:
                 frame.extend(struct.pack('>Q', len(payload)))
 
             frame.extend(payload)
-            client_socket.send(bytes(frame))
+            client_socket.sendall(bytes(frame))
         except Exception as e:
             print(f"[UPP WebSocket] Send error: {e}")
 
@@ -1288,12 +3957,9 @@ _ws_thread = None
 def get_palette_as_json(context):
     """Get current palette as JSON for web app."""
     props = context.scene.ultimate_palette
-    colors = []
-    for item in props.colors:  # Fixed: was palette_colors
-        r = int(item.color[0] * 255)
-        g = int(item.color[1] * 255)
-        b = int(item.color[2] * 255)
-        colors.append(f"#{r:02x}{g:02x}{b:02x}")
+    channels = (np.clip(read_palette_colors(props.colors), 0.0, 1.0) * 255).astype(np.uint8)
+    digits = channels.tobytes().hex()
+    colors = [f"#{digits[i:i + 6]}" for i in range(0, len(digits), 6)]
 
     return json.dumps({
         "type": "palette",
@@ -1309,27 +3975,16 @@ def apply_palette_from_json(context, data):
     hex_colors = data.get("colors", [])
     grid_size = data.get("gridSize", 8)
 
-    # Update grid size first if different
-    if str(grid_size) in [item[0] for item in GRID_SIZES]:
-        if props.grid_size != str(grid_size):
-            props.grid_size = str(grid_size)
-
-    # Clear and rebuild colors
-    props.colors.clear()  # Fixed: was palette_colors
-
-    for hex_color in hex_colors:
-        item = props.colors.add()
-        hex_clean = hex_color.lstrip('#')
-        r = int(hex_clean[0:2], 16) / 255.0
-        g = int(hex_clean[2:4], 16) / 255.0
-        b = int(hex_clean[4:6], 16) / 255.0
-        item.color = (r, g, b)
-        item.name = get_color_name(r, g, b)
-
-    # Update preview
-    colors_tuple = [tuple(c.color) for c in props.colors]
-    pm = PreviewManager()
-    pm.create_grid_preview(colors_tuple, grid_size)
+    with PaletteBatch(context):
+        # Update grid size first if different
+        if str(grid_size) in [item[0] for item in GRID_SIZES]:
+            if props.grid_size != str(grid_size):
+                props.grid_size = str(grid_size)
+
+        # Rebuild colors
+        digits = ''.join(hex_color.lstrip('#')[:6] for hex_color in hex_colors)
+        colors = np.frombuffer(bytes.fromhex(digits), dtype=np.uint8).reshape(-1, 3) / 255.0
+        write_palette_colors(props.colors, colors, locks=np.zeros(len(colors), dtype=bool))
 
     # Force UI update
     for area in bpy.context.screen.areas:
@@ -1348,6 +4003,85 @@ class UPP_OT_GeneratePalette(Operator):
     bl_label = "Generate Palette"
     bl_options = {'REGISTER', 'UNDO'}
     
+    def source_image_path(self, props):
+        """Resolved source image path, or None after reporting the problem."""
+        if not props.source_image_path:
+            self.report({'ERROR'}, "No image selected")
+            return None
+        
+        filepath = bpy.path.abspath(props.source_image_path)
+        if not os.path.exists(filepath):
+            self.report({'ERROR'}, f"Image not found")
+            return None
+        return filepath
+    
+    def invoke(self, context, event):
+        props = context.scene.ultimate_palette
+        if props.generation_source != 'IMAGE':
+            return self.execute(context)
+        
+        filepath = self.source_image_path(props)
+        if filepath is None:
+            return {'CANCELLED'}
+        
+        algorithm = props.extraction_algorithm
+        metric = props.color_metric
+        num_colors = int(props.grid_size) ** 2
+        
+        # Decoding and preferences need bpy, so they are read here; binning
+        # and clustering run on a worker thread while the UI stays live
+        try:
+            key, histogram, pixels = prepare_histogram(filepath)
+        except Exception as e:
+            self.report({'ERROR'}, f"Could not read image: {e}")
+            return {'CANCELLED'}
+        options = prepare_extraction(algorithm, num_colors)
+        
+        def work(job):
+            hist = histogram
+            if hist is None:
+                hist = build_color_histogram(pixels, key[3], key[4], lambda f: job.report(0.3 * f))
+            colors = extract_palette(hist, algorithm, num_colors,
+                                     lambda f: job.report(0.3 + 0.7 * f), metric, **options)
+            return hist, colors
+        
+        def on_done(result):
+            hist, colors = result
+            ImageColorCache().store(key, hist)
+            
+            scene_props = bpy.context.scene.ultimate_palette
+            colors = expand_colors_to_grid(colors, num_colors)
+            with PaletteBatch(bpy.context):
+                write_palette_colors(scene_props.colors, colors,
+                                     locks=np.zeros(len(colors), dtype=bool))
+        
+        self._job = JobScheduler().submit(Job(
+            f"Extracting from {os.path.basename(filepath)}", work, on_done=on_done
+        ))
+        self._timer = context.window_manager.event_timer_add(JOB_POLL_INTERVAL, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def modal(self, context, event):
+        job = self._job
+        
+        if job.closed:
+            context.window_manager.event_timer_remove(self._timer)
+            if job.error is not None:
+                self.report({'ERROR'}, f"Extraction failed: {job.error}")
+                return {'CANCELLED'}
+            if job.cancelled:
+                self.report({'WARNING'}, "Extraction cancelled")
+                return {'CANCELLED'}
+            self.report({'INFO'}, f"Extracted {int(context.scene.ultimate_palette.grid_size) ** 2} colors")
+            return {'FINISHED'}
+        
+        if event.type == 'ESC' and event.value == 'PRESS':
+            job.cancel()
+            return {'RUNNING_MODAL'}
+        
+        return {'PASS_THROUGH'}
+    
     def execute(self, context):
         props = context.scene.ultimate_palette
         grid_size = int(props.grid_size)
@@ -1357,12 +4091,10 @@ class UPP_OT_GeneratePalette(Operator):
         source = props.generation_source
         
         if source == 'PRESET':
-            cat = props.selected_preset_category
             name = props.selected_preset_name
+            colors = preset_colors(props.selected_preset_category, name, num_colors)
             
-            if cat in PRESET_PALETTES and name in PRESET_PALETTES[cat]:
-                preset_colors = list(PRESET_PALETTES[cat][name])
-                colors = expand_colors_to_grid(preset_colors, num_colors)
+            if colors is not None:
                 self.report({'INFO'}, f"Loaded: {name}")
             else:
                 self.report({'WARNING'}, "Select a preset first")
@@ -1377,48 +4109,31 @@ class UPP_OT_GeneratePalette(Operator):
             self.report({'INFO'}, f"Generated {props.harmony_type} palette")
         
         elif source == 'IMAGE':
-            if not props.source_image_path:
-                self.report({'ERROR'}, "No image selected")
-                return {'CANCELLED'}
-            
-            filepath = bpy.path.abspath(props.source_image_path)
-            if not os.path.exists(filepath):
-                self.report({'ERROR'}, f"Image not found")
+            filepath = self.source_image_path(props)
+            if filepath is None:
                 return {'CANCELLED'}
             
-            algo = props.extraction_algorithm
-            if algo == 'KMEANS':
-                colors = extract_colors_kmeans(filepath, num_colors)
-            elif algo == 'MEDIAN_CUT':
-                colors = extract_colors_median_cut(filepath, num_colors)
-            elif algo == 'DOMINANT':
-                colors = extract_colors_dominant(filepath, num_colors)
-            else:
-                colors = extract_colors_diverse(filepath, num_colors)
+            colors = extract_colors(filepath, props.extraction_algorithm, num_colors, props.color_metric)
             
+            # Images with fewer distinct colors than cells yield short lists
+            colors = expand_colors_to_grid(colors, num_colors)
             self.report({'INFO'}, f"Extracted {len(colors)} colors")
         
         elif source == 'RANDOM':
             base_hue = random.random()
             
-            for i in range(num_colors):
-                h = (base_hue + (i / num_colors) * 0.6 + random.uniform(-0.1, 0.1)) % 1.0
-                s = random.uniform(0.4, 1.0)
-                v = random.uniform(0.4, 1.0)
-                colors.append(hsv_to_rgb(h, s, v))
+            hsv = np.random.uniform(0.4, 1.0, (num_colors, 3))
+            hsv[:, 0] = (base_hue + np.arange(num_colors) / num_colors * 0.6
+                         + np.random.uniform(-0.1, 0.1, num_colors)) % 1.0
+            colors = color_tuples(hsv_to_rgb_array(hsv))
             
             self.report({'INFO'}, f"Generated random palette")
         
-        # Update palette
-        props.colors.clear()
-        for color in colors:
-            item = props.colors.add()
-            item.color = color[:3]
-            item.name = get_color_name(*color[:3])
-        
-        # Update preview
-        pm = PreviewManager()
-        pm.create_grid_preview(colors, grid_size)
+        # Update palette (names and preview are refreshed once on exit);
+        # a freshly generated palette starts unlocked
+        with PaletteBatch(context):
+            write_palette_colors(props.colors, [c[:3] for c in colors],
+                                 locks=np.zeros(len(colors), dtype=bool))
         
         return {'FINISHED'}
 
@@ -1454,16 +4169,18 @@ class UPP_OT_ApplyArrangement(Operator):
         props = context.scene.ultimate_palette
         grid_size = int(props.grid_size)
         
-        colors = [tuple(c.color) for c in props.colors]
-        arranged = arrange_colors(colors, props.arrangement_type, grid_size)
-        
-        for i, color in enumerate(arranged):
-            if i < len(props.colors):
-                props.colors[i].color = color[:3]
-                props.colors[i].name = get_color_name(*color[:3])
+        colors = read_palette_colors(props.colors).tolist()
+        if props.arrangement_type == 'ORIGINAL' or len(colors) == 0:
+            order = np.arange(len(colors))
+        else:
+            keys = PaletteKeyCache().get(colors)
+            order = arrangement_indices(keys, props.arrangement_type, grid_size,
+                                        props.color_metric)[:len(colors)]
         
-        pm = PreviewManager()
-        pm.create_grid_preview(arranged, grid_size)
+        arranged = [colors[i] if i >= 0 else ARRANGEMENT_FILL[i] for i in order.tolist()]
+        with PaletteBatch(context):
+            write_palette_colors(props.colors, arranged,
+                                 locks=reorder_locks(read_palette_locks(props.colors), order))
         
         self.report({'INFO'}, f"Applied {props.arrangement_type}")
         return {'FINISHED'}
@@ -1478,36 +4195,31 @@ class UPP_OT_ApplyAdjustments(Operator):
     def execute(self, context):
         props = context.scene.ultimate_palette
         
-        colors = []
-        for item in props.colors:
-            r, g, b = item.color[:3]
-            
-            if props.hue_shift != 0:
-                r, g, b = shift_hue(r, g, b, props.hue_shift)
-            
-            if props.saturation_mult != 1.0:
-                r, g, b = adjust_saturation(r, g, b, props.saturation_mult)
-            
-            if props.value_mult != 1.0:
-                r, g, b = adjust_value(r, g, b, props.value_mult)
-            
-            if props.temperature_shift != 0:
-                temp = props.temperature_shift * 0.1
-                r = clamp(r + temp)
-                b = clamp(b - temp)
-            
-            item.color = (r, g, b)
-            item.name = get_color_name(r, g, b)
-            colors.append((r, g, b))
+        colors = read_palette_colors(props.colors)
+        
+        if props.hue_shift != 0:
+            colors = shift_hue_array(colors, props.hue_shift)
+        
+        if props.saturation_mult != 1.0:
+            colors = adjust_saturation_array(colors, props.saturation_mult)
+        
+        if props.value_mult != 1.0:
+            colors = adjust_value_array(colors, props.value_mult)
+        
+        if props.temperature_shift != 0:
+            temp = props.temperature_shift * 0.1
+            colors = np.array(colors)
+            colors[:, 0] = np.clip(colors[:, 0] + temp, 0.0, 1.0)
+            colors[:, 2] = np.clip(colors[:, 2] - temp, 0.0, 1.0)
+        
+        with PaletteBatch(context):
+            write_palette_colors(props.colors, colors)
         
         props.hue_shift = 0.0
         props.saturation_mult = 1.0
         props.value_mult = 1.0
         props.temperature_shift = 0.0
         
-        pm = PreviewManager()
-        pm.create_grid_preview(colors, int(props.grid_size))
-        
         self.report({'INFO'}, "Applied adjustments")
         return {'FINISHED'}
 
@@ -1519,26 +4231,7 @@ class UPP_OT_FlipHorizontal(Operator):
     bl_options = {'REGISTER', 'UNDO'}
     
     def execute(self, context):
-        props = context.scene.ultimate_palette
-        grid_size = int(props.grid_size)
-        
-        colors = [tuple(c.color) for c in props.colors]
-        while len(colors) < grid_size * grid_size:
-            colors.append((0.5, 0.5, 0.5))
-        
-        result = []
-        for row in range(grid_size):
-            start = row * grid_size
-            end = start + grid_size
-            result.extend(reversed(colors[start:end]))
-        
-        for i, color in enumerate(result):
-            if i < len(props.colors):
-                props.colors[i].color = color
-        
-        pm = PreviewManager()
-        pm.create_grid_preview(result, grid_size)
-        
+        apply_grid_transform(context, ('FLIP_H',))
         return {'FINISHED'}
 
 
@@ -1549,26 +4242,7 @@ class UPP_OT_FlipVertical(Operator):
     bl_options = {'REGISTER', 'UNDO'}
     
     def execute(self, context):
-        props = context.scene.ultimate_palette
-        grid_size = int(props.grid_size)
-        
-        colors = [tuple(c.color) for c in props.colors]
-        while len(colors) < grid_size * grid_size:
-            colors.append((0.5, 0.5, 0.5))
-        
-        result = []
-        for row in range(grid_size - 1, -1, -1):
-            start = row * grid_size
-            end = start + grid_size
-            result.extend(colors[start:end])
-        
-        for i, color in enumerate(result):
-            if i < len(props.colors):
-                props.colors[i].color = color
-        
-        pm = PreviewManager()
-        pm.create_grid_preview(result, grid_size)
-        
+        apply_grid_transform(context, ('FLIP_V',))
         return {'FINISHED'}
 
 
@@ -1579,29 +4253,7 @@ class UPP_OT_RotateLeft(Operator):
     bl_options = {'REGISTER', 'UNDO'}
     
     def execute(self, context):
-        props = context.scene.ultimate_palette
-        grid_size = int(props.grid_size)
-        
-        colors = [tuple(c.color) for c in props.colors]
-        while len(colors) < grid_size * grid_size:
-            colors.append((0.5, 0.5, 0.5))
-        
-        result = [None] * (grid_size * grid_size)
-        for row in range(grid_size):
-            for col in range(grid_size):
-                old_idx = row * grid_size + col
-                new_row = grid_size - 1 - col
-                new_col = row
-                new_idx = new_row * grid_size + new_col
-                result[new_idx] = colors[old_idx]
-        
-        for i, color in enumerate(result):
-            if i < len(props.colors):
-                props.colors[i].color = color
-        
-        pm = PreviewManager()
-        pm.create_grid_preview(result, grid_size)
-        
+        apply_grid_transform(context, ('ROTATE_CCW',))
         return {'FINISHED'}
 
 
@@ -1612,29 +4264,31 @@ class UPP_OT_RotateRight(Operator):
     bl_options = {'REGISTER', 'UNDO'}
     
     def execute(self, context):
-        props = context.scene.ultimate_palette
-        grid_size = int(props.grid_size)
-        
-        colors = [tuple(c.color) for c in props.colors]
-        while len(colors) < grid_size * grid_size:
-            colors.append((0.5, 0.5, 0.5))
-        
-        result = [None] * (grid_size * grid_size)
-        for row in range(grid_size):
-            for col in range(grid_size):
-                old_idx = row * grid_size + col
-                new_row = col
-                new_col = grid_size - 1 - row
-                new_idx = new_row * grid_size + new_col
-                result[new_idx] = colors[old_idx]
-        
-        for i, color in enumerate(result):
-            if i < len(props.colors):
-                props.colors[i].color = color
-        
-        pm = PreviewManager()
-        pm.create_grid_preview(result, grid_size)
+        apply_grid_transform(context, ('ROTATE_CW',))
+        return {'FINISHED'}
+
+
+class UPP_OT_TransformGrid(Operator):
+    """Apply a chain of flips and rotations to the palette in one step"""
+    bl_idname = "upp.transform_grid"
+    bl_label = "Transform Grid"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    steps: StringProperty(
+        name="Steps",
+        default="",
+        description="Comma-separated transforms applied in order: "
+                    "FLIP_H, FLIP_V, ROTATE_CCW, ROTATE_CW, ROTATE_180, TRANSPOSE"
+    )
+    
+    def execute(self, context):
+        steps = [step.strip().upper() for step in self.steps.split(',') if step.strip()]
+        unknown = [step for step in steps if step not in GRID_TRANSFORMS]
+        if unknown:
+            self.report({'ERROR'}, f"Unknown grid transform: {', '.join(unknown)}")
+            return {'CANCELLED'}
         
+        apply_grid_transform(context, steps)
         return {'FINISHED'}
 
 
@@ -1645,9 +4299,12 @@ class UPP_OT_ExportImage(Operator):
     bl_options = {'REGISTER'}
     
     filepath: StringProperty(subtype='FILE_PATH')
+    # Set by invoke: exports started from the UI run as a background job
+    use_background: BoolProperty(default=False, options={'HIDDEN', 'SKIP_SAVE'})
     
     def invoke(self, context, event):
         props = context.scene.ultimate_palette
+        self.use_background = True
         
         ext_map = {
             'PNG': '.png', 'JPEG': '.jpg', 'EXR': '.exr',
@@ -1664,43 +4321,41 @@ class UPP_OT_ExportImage(Operator):
         props = context.scene.ultimate_palette
         grid_size = int(props.grid_size)
         resolution = int(props.export_resolution)
+        file_format = props.export_format
+        filepath = self.filepath
+        colors = read_palette_colors(props.colors)
         
-        colors = [tuple(c.color) for c in props.colors]
-        while len(colors) < grid_size * grid_size:
-            colors.append((0.5, 0.5, 0.5))
-        
-        img = bpy.data.images.new("UPP_Export_Temp", resolution, resolution, alpha=False)
-        
-        pixels = np.zeros((resolution, resolution, 4))
-        cell_size = resolution // grid_size
+        # Scripted and --background calls get the file before returning
+        if not self.use_background:
+            try:
+                export_grid_image(filepath, colors, grid_size, resolution, file_format)
+            except Exception as e:
+                self.report({'ERROR'}, f"Export failed: {e}")
+                return {'CANCELLED'}
+            self.report({'INFO'}, f"Exported to {filepath}")
+            return {'FINISHED'}
         
-        for i, color in enumerate(colors):
-            if i >= grid_size * grid_size:
-                break
-            
-            row = i // grid_size
-            col = i % grid_size
-            
-            x1, x2 = col * cell_size, (col + 1) * cell_size
-            y1 = (grid_size - 1 - row) * cell_size
-            y2 = y1 + cell_size
-            
-            pixels[y1:y2, x1:x2] = [color[0], color[1], color[2], 1.0]
+        cells = grid_cells(colors, grid_size)
         
-        img.pixels[:] = pixels.ravel().tolist()
+        # Encoding runs on a worker thread; formats Blender has to encode
+        # are streamed to a temporary PNG and transcoded on the main thread
+        streamed = file_format in GRID_IMAGE_WRITERS
+        target = filepath if streamed else make_temp_png()
         
-        img.filepath_raw = self.filepath
+        def work(job):
+            stream_grid_image(target, cells, resolution, file_format if streamed else 'PNG', job.report)
         
-        format_settings = {
-            'PNG': 'PNG', 'JPEG': 'JPEG', 'EXR': 'OPEN_EXR',
-            'TIFF': 'TIFF', 'BMP': 'BMP', 'TGA': 'TARGA'
-        }
-        img.file_format = format_settings.get(props.export_format, 'PNG')
+        def on_done(_):
+            if not streamed:
+                try:
+                    transcode_image(target, filepath, file_format)
+                finally:
+                    os.remove(target)
+            print(f"[UPP] Exported to {filepath}")
         
-        img.save_render(self.filepath)
-        bpy.data.images.remove(img)
+        JobScheduler().submit(Job(f"Exporting {os.path.basename(filepath)}", work, on_done=on_done))
         
-        self.report({'INFO'}, f"Exported to {self.filepath}")
+        self.report({'INFO'}, f"Exporting to {filepath}")
         return {'FINISHED'}
 
 
@@ -1714,7 +4369,7 @@ class UPP_OT_CreateMaterial(Operator):
         props = context.scene.ultimate_palette
         grid_size = int(props.grid_size)
         
-        colors = [tuple(c.color) for c in props.colors]
+        colors = read_palette_colors(props.colors).tolist()
         while len(colors) < grid_size * grid_size:
             colors.append((0.5, 0.5, 0.5))
         
@@ -1725,23 +4380,8 @@ class UPP_OT_CreateMaterial(Operator):
         resolution = 256
         img = bpy.data.images.new(img_name, resolution, resolution, alpha=False)
         
-        pixels = np.zeros((resolution, resolution, 4))
-        cell_size = resolution // grid_size
-        
-        for i, color in enumerate(colors):
-            if i >= grid_size * grid_size:
-                break
-            
-            row = i // grid_size
-            col = i % grid_size
-            
-            x1, x2 = col * cell_size, (col + 1) * cell_size
-            y1 = (grid_size - 1 - row) * cell_size
-            y2 = y1 + cell_size
-            
-            pixels[y1:y2, x1:x2] = [color[0], color[1], color[2], 1.0]
-        
-        img.pixels[:] = pixels.ravel().tolist()
+        pixels = rasterize_grid(colors, grid_size, resolution)
+        img.pixels.foreach_set(pixels.ravel())
         img.update()
         
         mat_name = "UPP_Palette_Material"
@@ -1790,6 +4430,8 @@ class UPP_OT_SetupTexturePaint(Operator):
     def execute(self, context):
         props = context.scene.ultimate_palette
         
+        colors = read_palette_colors(props.colors).tolist()
+        
         palette_name = "UPP_Palette"
         if palette_name in bpy.data.palettes:
             palette = bpy.data.palettes[palette_name]
@@ -1797,9 +4439,9 @@ class UPP_OT_SetupTexturePaint(Operator):
         else:
             palette = bpy.data.palettes.new(palette_name)
         
-        for item in props.colors:
+        for c in colors:
             color = palette.colors.new()
-            color.color = item.color[:3]
+            color.color = c
         
         ts = context.tool_settings
         ts.image_paint.palette = palette
@@ -1817,7 +4459,7 @@ class UPP_OT_CopyToClipboard(Operator):
         props = context.scene.ultimate_palette
         fmt = props.clipboard_format
         
-        colors = [(c.color[0], c.color[1], c.color[2]) for c in props.colors]
+        colors = read_palette_colors(props.colors).tolist()
         
         if fmt == 'HEX':
             text = '\n'.join([
@@ -1835,11 +4477,10 @@ class UPP_OT_CopyToClipboard(Operator):
                 for c in colors
             ])
         elif fmt == 'HSL':
-            lines = []
-            for c in colors:
-                h, l, s = colorsys.rgb_to_hls(c[0], c[1], c[2])
-                lines.append(f"hsl({int(h*360)}, {int(s*100)}%, {int(l*100)}%)")
-            text = '\n'.join(lines)
+            text = '\n'.join([
+                f"hsl({int(h*360)}, {int(s*100)}%, {int(l*100)}%)"
+                for h, l, s in rgb_to_hls_array(as_color_array(colors)).tolist()
+            ])
         elif fmt == 'ARRAY_HEX':
             hex_colors = [
                 f"'#{int(c[0]*255):02x}{int(c[1]*255):02x}{int(c[2]*255):02x}'"
@@ -1895,10 +4536,12 @@ class UPP_OT_SavePreset(Operator):
         preset.name = self.preset_name
         preset.grid_size = int(props.grid_size)
         
-        for item in props.colors:
-            color = preset.colors.add()
-            color.color = item.color
-            color.name = item.name
+        write_palette_colors(
+            preset.colors,
+            read_palette_colors(props.colors),
+            names=read_palette_names(props.colors),
+            locks=read_palette_locks(props.colors),
+        )
         
         self.report({'INFO'}, f"Saved: {self.preset_name}")
         return {'FINISHED'}
@@ -1918,17 +4561,15 @@ class UPP_OT_LoadSavedPreset(Operator):
         if self.index < len(props.saved_presets):
             preset = props.saved_presets[self.index]
             
-            props.grid_size = str(preset.grid_size)
-            
-            props.colors.clear()
-            for c in preset.colors:
-                item = props.colors.add()
-                item.color = c.color
-                item.name = c.name
-            
-            colors = [tuple(c.color) for c in props.colors]
-            pm = PreviewManager()
-            pm.create_grid_preview(colors, preset.grid_size)
+            with PaletteBatch(context, rename=False):
+                props.grid_size = str(preset.grid_size)
+                
+                write_palette_colors(
+                    props.colors,
+                    read_palette_colors(preset.colors),
+                    names=read_palette_names(preset.colors),
+                    locks=read_palette_locks(preset.colors),
+                )
             
             self.report({'INFO'}, f"Loaded: {preset.name}")
         
@@ -1963,12 +4604,10 @@ class UPP_OT_UpdatePreview(Operator):
         props = context.scene.ultimate_palette
         grid_size = int(props.grid_size)
         
-        colors = [tuple(c.color) for c in props.colors]
+        colors = read_palette_colors(props.colors).tolist()
         
         if len(colors) == 0:
-            for i in range(grid_size * grid_size):
-                h = i / (grid_size * grid_size)
-                colors.append(hsv_to_rgb(h, 0.7, 0.8))
+            colors = hue_wheel(grid_size * grid_size)
         
         pm = PreviewManager()
         pm.create_grid_preview(colors, grid_size)
@@ -1986,16 +4625,10 @@ class UPP_OT_InitializePalette(Operator):
         grid_size = int(props.grid_size)
         num_colors = grid_size * grid_size
         
-        if len(props.colors) == 0:
-            for i in range(num_colors):
-                item = props.colors.add()
-                h = i / num_colors
-                item.color = hsv_to_rgb(h, 0.7, 0.8)
-                item.name = get_color_name(*item.color)
-        
-        colors = [tuple(c.color) for c in props.colors]
-        pm = PreviewManager()
-        pm.create_grid_preview(colors, grid_size)
+        with PaletteBatch(context, rename=len(props.colors) == 0):
+            if len(props.colors) == 0:
+                colors = hue_wheel(num_colors)
+                write_palette_colors(props.colors, colors)
         
         return {'FINISHED'}
 
@@ -2008,31 +4641,54 @@ class UPP_OT_BatchCreateMaterials(Operator):
     
     def execute(self, context):
         props = context.scene.ultimate_palette
-        count = 0
         
-        for i, item in enumerate(props.colors):
-            mat_name = f"UPP_{i+1:02d}_{item.name}"
-            
-            if mat_name in bpy.data.materials:
-                mat = bpy.data.materials[mat_name]
-            else:
-                mat = bpy.data.materials.new(mat_name)
-            
-            mat.use_nodes = True
-            nodes = mat.node_tree.nodes
-            
-            bsdf = None
-            for node in nodes:
-                if node.type == 'BSDF_PRINCIPLED':
-                    bsdf = node
-                    break
-            
-            if bsdf:
-                bsdf.inputs['Base Color'].default_value = (*item.color, 1.0)
-            
-            count += 1
+        colors = read_palette_colors(props.colors).tolist()
+        names = read_palette_names(props.colors)
+        
+        # Materials are bpy data, so they are created on the main thread in
+        # short slices instead of one blocking loop
+        def work(job):
+            for i, (color, name) in enumerate(zip(colors, names)):
+                mat_name = f"UPP_{i+1:02d}_{name}"
+                
+                if mat_name in bpy.data.materials:
+                    mat = bpy.data.materials[mat_name]
+                else:
+                    mat = bpy.data.materials.new(mat_name)
+                
+                mat.use_nodes = True
+                nodes = mat.node_tree.nodes
+                
+                bsdf = None
+                for node in nodes:
+                    if node.type == 'BSDF_PRINCIPLED':
+                        bsdf = node
+                        break
+                
+                if bsdf:
+                    bsdf.inputs['Base Color'].default_value = (*color, 1.0)
+                
+                yield (i + 1) / len(colors)
+            return len(colors)
         
-        self.report({'INFO'}, f"Created {count} materials")
+        JobScheduler().submit(Job(
+            f"Creating {len(colors)} materials", work,
+            on_done=lambda count: print(f"[UPP] Created {count} materials"),
+            threaded=False,
+        ))
+        
+        self.report({'INFO'}, f"Creating {len(colors)} materials")
+        return {'FINISHED'}
+
+
+class UPP_OT_CancelJobs(Operator):
+    """Cancel running background jobs"""
+    bl_idname = "upp.cancel_jobs"
+    bl_label = "Cancel"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        JobScheduler().cancel_all()
         return {'FINISHED'}
 
 
@@ -2142,6 +4798,126 @@ class UPP_OT_OpenWebApp(Operator):
         return {'FINISHED'}
 
 
+# ============================================================================
+# SWATCH LIST
+# ============================================================================
+# Large palettes are browsed through a UIList, which only draws the rows in
+# view. Filtering and sorting work on whole arrays, and the hue masks and
+# sort orders are memoized on the palette's PaletteKeys table, so a redraw
+# of an unchanged palette costs a few array operations.
+
+def hue_filter_mask(keys, hue_filter):
+    """Boolean mask of the swatches that belong to a SWATCH_HUE_FILTERS family."""
+    memo_key = ('HUE_FILTER', hue_filter)
+    if memo_key not in keys.memo:
+        saturation, value = keys.columns['saturation'], keys.columns['value']
+        neutral = (saturation < NEUTRAL_SATURATION) | (value < NEUTRAL_VALUE)
+        
+        if hue_filter == 'NEUTRAL':
+            mask = neutral
+        elif hue_filter in HUE_FILTER_RANGES:
+            start, end = HUE_FILTER_RANGES[hue_filter]
+            degrees = keys.columns['hue'] * 360.0
+            if start < end:
+                in_range = (degrees >= start) & (degrees < end)
+            else:
+                in_range = (degrees >= start) | (degrees < end)
+            mask = in_range & ~neutral
+        else:
+            mask = np.ones(len(keys), dtype=bool)
+        keys.memo[memo_key] = mask
+    return keys.memo[memo_key]
+
+
+def filter_swatches(collection, hue_filter='ALL', locked_only=False, pattern="", sort_by='INDEX'):
+    """Visible swatches and display order for a palette collection.
+
+    Returns (visible, order): a bool mask over the collection and the
+    swatch indices in display order. Names are only read when filtering
+    or sorting by name.
+    """
+    keys = PaletteKeyCache().get(read_palette_colors(collection))
+    visible = hue_filter_mask(keys, hue_filter).copy()
+    
+    if locked_only:
+        visible &= read_palette_locks(collection)
+    
+    names = None
+    if pattern or sort_by == 'NAME':
+        names = read_palette_names(collection)
+    if pattern:
+        pattern = f"*{pattern.lower()}*"
+        visible &= np.array([fnmatch.fnmatch(name.lower(), pattern) for name in names], dtype=bool)
+    
+    if sort_by == 'HUE':
+        order = keys.order('luminance', 'hue')
+    elif sort_by == 'LUMINANCE':
+        order = keys.order('luminance')
+    elif sort_by == 'NAME':
+        order = np.array(sorted(range(len(names)), key=lambda i: names[i].lower()), dtype=np.intp)
+    else:
+        order = np.arange(len(keys))
+    return visible, order
+
+
+class UPP_UL_Swatches(UIList):
+    """Palette swatches, filterable by name, hue family and lock"""
+    
+    filter_hue: EnumProperty(
+        name="Hue",
+        items=SWATCH_HUE_FILTERS,
+        default='ALL',
+        description="Only show swatches of this hue family"
+    )
+    
+    filter_locked: BoolProperty(
+        name="Locked Only",
+        default=False,
+        description="Only show locked swatches"
+    )
+    
+    sort_by: EnumProperty(
+        name="Sort By",
+        items=SWATCH_SORT_MODES,
+        default='INDEX',
+        description="Order in which swatches are listed"
+    )
+    
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        swatch = row.row(align=True)
+        swatch.ui_units_x = 2.0
+        swatch.prop(item, "color", text="")
+        row.prop(item, "name", text="", emboss=False)
+        row.label(text=str(index + 1))
+        row.prop(item, "locked", text="", emboss=False,
+                 icon='LOCKED' if item.locked else 'UNLOCKED')
+    
+    def draw_filter(self, context, layout):
+        row = layout.row(align=True)
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "use_filter_invert", text="", icon='ARROW_LEFTRIGHT')
+        
+        row = layout.row(align=True)
+        row.prop(self, "filter_hue", text="")
+        row.prop(self, "filter_locked", text="", icon='LOCKED')
+        row.prop(self, "sort_by", text="")
+        row.prop(self, "use_filter_sort_reverse", text="", icon='SORT_DESC')
+    
+    def filter_items(self, context, data, propname):
+        collection = getattr(data, propname)
+        if len(collection) == 0:
+            return [], []
+        
+        visible, order = filter_swatches(collection, self.filter_hue, self.filter_locked,
+                                         self.filter_name, self.sort_by)
+        flags = np.where(visible, self.bitflag_filter_item, 0)
+        # UIList wants each item's new position, the inverse of the order
+        positions = np.empty_like(order)
+        positions[order] = np.arange(len(order))
+        return flags.tolist(), positions.tolist()
+
+
 # ============================================================================
 # PANELS
 # ============================================================================
@@ -2165,6 +4941,15 @@ class UPP_PT_MainPanel(Panel):
             box = layout.box()
             box.scale_y = 1.5
             box.operator("upp.initialize_palette", text="Initialize Palette", icon='ADD')
+        
+        scheduler = JobScheduler()
+        if scheduler.jobs:
+            box = layout.box()
+            for job in scheduler.jobs:
+                box.progress(factor=job.progress, text=job.label)
+            box.operator("upp.cancel_jobs", icon='CANCEL')
+        elif scheduler.last_message:
+            layout.label(text=scheduler.last_message, icon='INFO')
 
 
 class UPP_PT_GeneratePanel(Panel):
@@ -2192,25 +4977,12 @@ class UPP_PT_GeneratePanel(Panel):
         # Source-specific options
         if props.generation_source == 'PRESET':
             box.prop(props, "preset_category", text="", icon='COLLECTION_COLOR_04')
+            box.template_icon_view(props, "preset_browser", show_labels=True,
+                                   scale=6.0, scale_popup=5.0)
             
-            col = box.column(align=True)
-            for category, presets in PRESET_PALETTES.items():
-                if props.preset_category != 'ALL' and props.preset_category != category:
-                    continue
-                
-                col.label(text=category, icon='FILE_FOLDER')
-                
-                for name in presets.keys():
-                    row = col.row(align=True)
-                    is_selected = (props.selected_preset_category == category and 
-                                   props.selected_preset_name == name)
-                    
-                    op = row.operator("upp.load_preset", 
-                                      text=name, 
-                                      icon='RADIOBUT_ON' if is_selected else 'RADIOBUT_OFF',
-                                      depress=is_selected)
-                    op.category = category
-                    op.name = name
+            if props.selected_preset_name:
+                box.label(text=f"{props.selected_preset_category}: {props.selected_preset_name}",
+                          icon='RADIOBUT_ON')
         
         elif props.generation_source == 'COLOR':
             row = box.row(align=True)
@@ -2233,6 +5005,8 @@ class UPP_PT_GeneratePanel(Panel):
                     thumb_box.template_icon(icon_value=img.preview.icon_id, scale=5.0)
             
             box.prop(props, "extraction_algorithm", text="", icon='OUTLINER_OB_POINTCLOUD')
+            if props.extraction_algorithm in METRIC_EXTRACTORS:
+                box.prop(props, "color_metric", text="")
         
         elif props.generation_source == 'RANDOM':
             box.label(text="Random harmonious colors", icon='SHADERFX')
@@ -2245,6 +5019,10 @@ class UPP_PT_GeneratePanel(Panel):
         row.operator("upp.generate_palette", text="Generate", icon='PLAY')
 
 
+# Largest palette whose swatches the grid panel draws as individual widgets
+MAX_SWATCH_WIDGETS = 64
+
+
 class UPP_PT_GridPanel(Panel):
     """Palette Grid panel"""
     bl_label = "Palette Grid"
@@ -2286,7 +5064,13 @@ class UPP_PT_GridPanel(Panel):
             box = layout.box()
             box.label(text="No preview", icon='IMAGE_DATA')
         
-        # Color grid - allow up to 16 columns
+        # Small grids get one widget per swatch; larger palettes use the
+        # swatch list, which only draws the rows in view
+        if grid_size * grid_size > MAX_SWATCH_WIDGETS:
+            layout.template_list("UPP_UL_Swatches", "", props, "colors",
+                                 props, "active_color_index", rows=8)
+            return
+        
         grid_box = layout.box()
         grid_flow = grid_box.grid_flow(
             row_major=True, 
@@ -2323,6 +5107,9 @@ class UPP_PT_ArrangementPanel(Panel):
         row = layout.row(align=True)
         row.prop(props, "arrangement_type", text="")
         row.operator("upp.apply_arrangement", text="", icon='CHECKMARK')
+        
+        if props.arrangement_type in {'GRADIENT', 'SMOOTH_GRID'}:
+            layout.prop(props, "color_metric", text="")
 
 
 class UPP_PT_AdjustmentsPanel(Panel):
@@ -2498,6 +5285,7 @@ class UPP_PT_WebSyncPanel(Panel):
 # ============================================================================
 
 classes = [
+    UPP_AddonPreferences,
     UPP_PaletteColorItem,
     UPP_PalettePreset,
     UPP_Properties,
@@ -2510,6 +5298,7 @@ classes = [
     UPP_OT_FlipVertical,
     UPP_OT_RotateLeft,
     UPP_OT_RotateRight,
+    UPP_OT_TransformGrid,
     UPP_OT_ExportImage,
     UPP_OT_CreateMaterial,
     UPP_OT_SetupTexturePaint,
@@ -2520,11 +5309,14 @@ classes = [
     UPP_OT_UpdatePreview,
     UPP_OT_InitializePalette,
     UPP_OT_BatchCreateMaterials,
+    UPP_OT_CancelJobs,
     UPP_OT_StartWebSocket,
     UPP_OT_StopWebSocket,
     UPP_OT_SendToWeb,
     UPP_OT_OpenWebApp,
 
+    UPP_UL_Swatches,
+
     UPP_PT_MainPanel,
     UPP_PT_GeneratePanel,
     UPP_PT_GridPanel,
@@ -2544,6 +5336,8 @@ def register():
     
     bpy.types.Scene.ultimate_palette = PointerProperty(type=UPP_Properties)
     
+    ColorNameIndex().build()
+    
     print("[Ultimate Palette Pro] v1.3.0 loaded")
 
 
@@ -2555,8 +5349,20 @@ def unregister():
         _ws_server.stop()
         _ws_server = None
 
+    if bpy.app.timers.is_registered(flush_preview):
+        bpy.app.timers.unregister(flush_preview)
+    
+    JobScheduler().shutdown()
+    if bpy.app.timers.is_registered(poll_jobs):
+        bpy.app.timers.unregister(poll_jobs)
+    ExtractionPool().shutdown()
+    
     pm = PreviewManager()
     pm.cleanup()
+    ImageColorCache().clear()
+    ColorNameIndex().clear()
+    PaletteKeyCache().clear()
+    PresetThumbnails().clear()
 
     del bpy.types.Scene.ultimate_palette
 